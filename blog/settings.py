@@ -79,7 +79,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',  # Authenticated users can write, others can read
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.PageOrCursorPagination',  # ?pagination=cursor for keyset pages
     'PAGE_SIZE': 10,
 
     # Throttling: Implement throttling to prevent abuse of your API.
@@ -115,10 +115,13 @@ DEFAULT_PERMISSION_CLASSES: Defines the default permissions.
 IsAuthenticatedOrReadOnly means that authenticated users can perform write operations, while others can only read.
 
 DEFAULT_PAGINATION_CLASS and PAGE_SIZE: Sets the pagination class and the number of items per page.
+Page-number pagination is the default; clients that scroll deep (or poll while new rows arrive)
+can request cursor pagination with ?pagination=cursor and follow the returned next/previous links.
 '''
 
 
 MIDDLEWARE = [
+    'core.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -201,6 +204,82 @@ environment variable (you’ll obtain your database’s URL from the Render Dash
 '''
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bingeblog',
+    }
+}
+
+'''
+The local-memory cache is per process. It is enough for a single gunicorn worker; when running
+several workers or instances, point this at a shared backend (e.g. Redis or Memcached) so that
+cache invalidation (unread buzz counts, etc.) is seen by every process.
+'''
+
+
+# Query instrumentation
+# core.middleware.QueryInstrumentationMiddleware counts each request's queries; views listed
+# here (by URL name) may not run more than the given number of queries on a GET, session and
+# user lookups included.
+
+QUERY_BUDGETS = {
+    'blogs:post_list': 6,
+    'blogs:post_detail': 6,
+    'blogs:tag_detail': 7,
+    'search:search': 6,
+    'search:search_ajax': 3,
+    'search:suggest': 3,
+    'buzz:buzz_list': 5,
+    'buzz:buzz_detail': 7,
+    'blogs:blogpost-list': 6,
+    'blogs:blogpost-detail': 5,
+    'blogs:tag-list': 4,
+    'comments:comment-list': 5,
+    'comments:comment-detail': 4,
+    'buzz:buzz-list': 4,
+}
+
+# Over-budget views raise in development and tests, and only log a warning in production
+QUERY_BUDGET_RAISE = DEBUG
+
+# New comments queue their buzz in buzz.models.BuzzOutbox; a background thread (buzz.outbox)
+# delivers the queue in batches. BUZZ_ASYNC_DELIVERY=False delivers each comment's buzz in its
+# own request instead, which is what the test runner (TEST_RUNNER below) switches to.
+BUZZ_ASYNC_DELIVERY = os.environ.get('BUZZ_ASYNC_DELIVERY', 'True') != 'False'
+
+# TestCase transactions never commit, so core.runner runs the suite with synchronous buzz delivery
+TEST_RUNNER = 'core.runner.TestRunner'
+
+# Seconds per buzz digest window: comments on one post within a window fold into a single
+# buzz with a counter. 0 keeps one buzz per comment.
+BUZZ_COALESCE_WINDOW = int(os.environ.get('BUZZ_COALESCE_WINDOW', 0))
+
+# Read buzzes older than this many days are moved to buzz.models.ArchivedBuzz by the
+# archive_buzzes command, or every BUZZ_RETENTION_INTERVAL seconds by the buzz outbox
+# worker, which then also runs with synchronous delivery (0 leaves it to the command).
+BUZZ_RETENTION_DAYS = int(os.environ.get('BUZZ_RETENTION_DAYS', 90))
+BUZZ_RETENTION_INTERVAL = int(os.environ.get('BUZZ_RETENTION_INTERVAL', 0))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Set QUERY_LOG_LEVEL=INFO to log every request's query count and timings
+        'core.queries': {
+            'handlers': ['console'],
+            'level': os.environ.get('QUERY_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -59,6 +59,7 @@ urlpatterns = [
     # API URLs
     path('api/blogs/', include('blogs.urls')),  # API routes for blogs
     path('api/comments/', include('comments.urls')),  # API routes for comments
+    path('api/buzz/', include('buzz.urls')),  # API routes for buzzes
 ]
 
 
@@ -0,0 +1,103 @@
+from django.db import transaction
+from comments.models import Comment
+from .models import BlogPost, Tag
+from .signals import posts_imported
+
+
+BULK_IMPORT_MAX_POSTS = 5000
+BULK_IMPORT_BATCH_SIZE = 1000
+
+
+def resolve_tags(names):
+    """
+    Return ({name: Tag}, [tags created]) for these names, creating the missing ones with
+    one INSERT. Existing tags are read in one query and new ones are read back in another.
+    """
+    names = set(names)
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = names - set(tags)
+    created = []
+    if missing:
+        # ignore_conflicts: a concurrent import may create the same name first; either way
+        # the pks are not returned, so read the rows back
+        Tag.objects.bulk_create([Tag(name=name) for name in sorted(missing)], ignore_conflicts=True)
+        created = list(Tag.objects.filter(name__in=missing))
+        tags.update((tag.name, tag) for tag in created)
+    return tags, created
+
+
+def count_comments(comments):
+    return sum(1 + count_comments(comment['replies']) for comment in comments)
+
+
+def create_comments(posts, items, author, batch_size):
+    """
+    Insert the comment trees one depth level at a time: a level's bulk_create returns
+    the pks its paths are built from, and those rows are the next level's parents.
+    Reply counts are known from the payload, so they are written with the rows.
+    """
+    level = [(post, None, comment) for post, item in zip(posts, items) for comment in item['comments']]
+    created = []
+    while level:
+        comments = [
+            Comment(
+                post=post, parent=parent, author_id=data['author'] or author.pk,
+                content=data['content'], reply_count=len(data['replies']),
+            )
+            for post, parent, data in level
+        ]
+        Comment.objects.bulk_create(comments, batch_size=batch_size)
+        for comment in comments:
+            comment.path = comment.build_path()
+        Comment.objects.bulk_update(comments, ['path'], batch_size=batch_size)
+        created.extend(comments)
+        level = [
+            (post, comment, reply)
+            for comment, (post, parent, data) in zip(comments, level) for reply in data['replies']
+        ]
+    return created
+
+
+@transaction.atomic
+def import_posts(author, items, batch_size=BULK_IMPORT_BATCH_SIZE):
+    """
+    Create posts (with their tags and comment trees) from validated BlogPostImportSerializer
+    data in a fixed number of statements per batch, however many posts there are.
+
+    Nothing goes through Model.save(), so the per-row signals don't fire; instead
+    posts_imported is sent once with everything that was written, and the search index,
+    page cache and buzz receivers each handle the whole import in one pass.
+    """
+    tags, new_tags = resolve_tags(name for item in items for name in item['tags'])
+
+    posts = [
+        BlogPost(title=item['title'], content=item['content'], author=author, comment_count=count_comments(item['comments']))
+        for item in items
+    ]
+    BlogPost.objects.bulk_create(posts, batch_size=batch_size)
+
+    Link = BlogPost.tags.through
+    links = [
+        Link(blogpost_id=post.pk, tag_id=tags[name].pk)
+        for post, item in zip(posts, items) for name in dict.fromkeys(item['tags'])
+    ]
+    Link.objects.bulk_create(links, batch_size=batch_size)
+
+    comments = create_comments(posts, items, author, batch_size)
+
+    used = {link.tag_id for link in links}
+    posts_imported.send(
+        sender=BlogPost,
+        posts=posts,
+        comments=comments,
+        tags=[tag for tag in tags.values() if tag.pk in used],
+        new_tags=new_tags,
+    )
+    return posts, comments
+
+
+'''
+bulk_create returns primary keys on PostgreSQL (and on SQLite 3.35+), which the tag links
+and comment paths depend on. The denormalized comment_count and reply_count columns are
+filled from the payload, so the counters need no reconciling afterwards.
+'''
@@ -0,0 +1,77 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from .models import Tag
+
+
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def tags_version_key(post_id):
+    return f'blogs:post_tags_version:{post_id}'
+
+
+def card_cache_key(template_name, post, tags_version):
+    # Edits move updated_at and new comments move comment_count, so either gives a new key
+    return 'blogs:card:%s:%s:%s:%s:%s' % (
+        template_name, post.pk, post.updated_at.timestamp(), post.comment_count, tags_version,
+    )
+
+
+def bump_tags_version(post_ids):
+    """
+    Give these posts a new tag-set version, orphaning every card cached under the old one,
+    once the current transaction commits (right away outside one).
+    """
+    keys = [tags_version_key(post_id) for post_id in post_ids]
+    # Bumped before the commit, a card rendered with the old tags would be cached under the new version
+    transaction.on_commit(lambda: cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None))
+
+
+def get_tags_versions(posts):
+    """
+    {post_id: tag-set version}. A missing version (never set, or evicted) is replaced by a fresh
+    one rather than a default, so a card rendered with an older tag set can never match again.
+    """
+    keys = {post.pk: tags_version_key(post.pk) for post in posts}
+    found = cache.get_many(keys.values())
+    missing = {keys[post.pk]: uuid.uuid4().hex for post in posts if keys[post.pk] not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return {post_id: found[key] for post_id, key in keys.items()}
+
+
+def attach_cards(posts, template_name):
+    """
+    Set `post.card` to the rendered `template_name` card for every post, reading all cached
+    cards in one get_many. Only cache misses get their tags loaded (one prefetch query for
+    all of them) and are rendered and stored.
+    """
+    posts = list(posts)
+    versions = get_tags_versions(posts)
+    keys = {post.pk: card_cache_key(template_name, post, versions[post.pk]) for post in posts}
+    cards = cache.get_many(keys.values())
+
+    misses = [post for post in posts if keys[post.pk] not in cards]
+    if misses:
+        prefetch_related_objects(misses, Prefetch('tags', queryset=Tag.objects.only('id', 'name')))
+        rendered = {keys[post.pk]: render_to_string(template_name, {'post': post}) for post in misses}
+        cache.set_many(rendered, CARD_CACHE_TIMEOUT)
+        cards.update(rendered)
+
+    for post in posts:
+        post.card = mark_safe(cards[keys[post.pk]])
+    return posts
+
+
+'''
+Post cards (title, author, content, tags, comment count) are cached per post and per template.
+The key carries the post's updated_at and comment_count, so edits and new comments are picked
+up without any explicit invalidation; tag changes don't touch the post row, so they bump a
+per-post tag-set version instead (see blogs.signals).
+'''
@@ -0,0 +1,52 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from comments.models import Comment
+from .models import BlogPost, Tag
+
+
+EXPORT_CHUNK_SIZE = 500
+
+
+def export_posts(chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield every post as a plain dict with its tag names and comments, oldest first.
+
+    Posts are read through .iterator(chunk_size), a server-side cursor on PostgreSQL, and the
+    tags and comments are prefetched per chunk, so memory is bounded by one chunk of posts
+    however many there are in total.
+    """
+    posts = BlogPost.objects.select_related('author').prefetch_related(
+        Prefetch('tags', queryset=Tag.objects.only('id', 'name')),
+        Prefetch('comments', queryset=Comment.objects.select_related('author').order_by('path')),
+    ).order_by('id')
+
+    for post in posts.iterator(chunk_size=chunk_size):
+        yield {
+            'id': post.pk,
+            'title': post.title,
+            'content': post.content,
+            'author': post.author.username,
+            'tags': [tag.name for tag in post.tags.all()],
+            'created_at': post.created_at,
+            'updated_at': post.updated_at,
+            # Thread order (depth first); `parent` rebuilds the tree
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'parent': comment.parent_id,
+                    'author': comment.author.username,
+                    'content': comment.content,
+                    'created_at': comment.created_at,
+                    'updated_at': comment.updated_at,
+                }
+                for comment in post.comments.all()
+            ],
+        }
+
+
+def ndjson_lines(records):
+    """One compact JSON document per line (NDJSON), as bytes."""
+    for record in records:
+        yield (json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n').encode()
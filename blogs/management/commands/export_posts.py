@@ -0,0 +1,34 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand
+from blogs.export import EXPORT_CHUNK_SIZE, export_posts, ndjson_lines
+
+
+class Command(BaseCommand):
+    help = "Write every post with its tags and comments as NDJSON, streaming from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help="File to write; defaults to standard output.")
+        parser.add_argument('--gzip', action='store_true', help="Gzip the output.")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        stream = gzip.GzipFile(fileobj=output, mode='wb') if options['gzip'] else output
+
+        count = 0
+        try:
+            for line in ndjson_lines(export_posts(chunk_size=options['chunk_size'])):
+                stream.write(line)
+                count += 1
+        finally:
+            if stream is not output:
+                stream.close()  # Writes the gzip trailer; leaves `output` open
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Exported {count} posts to {options['output']}"))
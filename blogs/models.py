@@ -1,4 +1,6 @@
 from django.utils import timezone
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import User  # Import the User model for author field
 
@@ -20,6 +22,21 @@ class Tag(models.Model):
 
 
 
+class BlogPostQuerySet(models.QuerySet):
+    def with_card_relations(self):
+        """
+        Eager-load everything a post card renders (author and tag names), so a
+        listing page costs a fixed number of queries however many rows it shows.
+        """
+        return self.select_related('author').prefetch_related(
+            models.Prefetch('tags', queryset=Tag.objects.only('id', 'name'))
+        )
+
+
+
+
+
+
 class BlogPost(models.Model):
     # Title of the blog post
     title = models.CharField(max_length=200, help_text="Enter the title of the blog post")
@@ -38,11 +55,24 @@ class BlogPost(models.Model):
 
     tags = models.ManyToManyField(Tag, blank=True, related_name='blog_posts')
 
+    # Number of comments (replies included), maintained by comments.signals
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Weighted title/content tsvector for PostgreSQL full-text search, maintained by search.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = BlogPostQuerySet.as_manager()
+
     # Metadata (like ordering)
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Blog Post'
         verbose_name_plural = 'Blog Posts'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='blogpost_search_vector_idx'),
+            # Backs newest-first listings and keyset (cursor) pagination
+            models.Index(fields=['-created_at', '-id'], name='blogpost_created_id_idx'),
+        ]
 
     # String representation of the model (useful in the admin panel)
     def __str__(self):
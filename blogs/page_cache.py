@@ -0,0 +1,91 @@
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+
+def list_scope():
+    return 'list'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def tag_scope(tag_name):
+    # Tag names can hold characters some cache backends don't accept in keys
+    return 'tag:' + hashlib.md5(tag_name.encode()).hexdigest()
+
+
+def page_version_key(scope):
+    return f'blogs:page_version:{scope}'
+
+
+def bump_page_versions(scopes):
+    """
+    Invalidate every cached page in these scopes by giving each scope a new version, once
+    the current transaction commits (right away outside one).
+    """
+    keys = [page_version_key(scope) for scope in scopes]
+    # Bumped before the commit, a page rendered from the old rows would be cached under the new version
+    transaction.on_commit(lambda: cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None))
+
+
+def get_page_version(scope):
+    key = page_version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        # Never a default: a page cached under an evicted version must not match again
+        version = uuid.uuid4().hex
+        cache.set(key, version, timeout=None)
+    return version
+
+
+class AnonymousPageCacheMixin:
+    """
+    Serve GET/HEAD requests from anonymous users out of a whole-response cache.
+
+    Views say which invalidation scope their page belongs to (get_page_cache_scope); the
+    signal handlers in blogs.signals and comments.signals bump a scope's version when a
+    post, its tags or its comments change, which orphans every page cached under it.
+    Responses carry an ETag, Vary: Cookie (logged-in users get a different page) and
+    must-revalidate, so browsers come back with If-None-Match and get a 304.
+    """
+    page_cache_timeout = PAGE_CACHE_TIMEOUT
+
+    def get_page_cache_scope(self):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = 'blogs:page:%s:%s' % (get_page_version(self.get_page_cache_scope()), path)
+        cached = cache.get(key)
+        if cached is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if hasattr(response, 'render'):
+                response.render()
+            cached = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': quote_etag(hashlib.md5(response.content).hexdigest()),
+            }
+            cache.set(key, cached, self.page_cache_timeout)
+        else:
+            response = HttpResponse(cached['content'], content_type=cached['content_type'])
+
+        response['ETag'] = cached['etag']
+        patch_vary_headers(response, ['Cookie'])
+        patch_cache_control(response, max_age=0, must_revalidate=True)
+        return get_conditional_response(request, etag=cached['etag'], response=response)
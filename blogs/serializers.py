@@ -5,7 +5,10 @@ such as querysets and model instances to be converted to native Python datatypes
 that can then be easily rendered into JSON, XML, or other content types.
 '''
 
+from django.contrib.auth.models import User
 from rest_framework import serializers
+from comments.models import MAX_DEPTH
+from comments.serializers import CommentImportSerializer
 from .models import BlogPost, Tag
 
 class TagSerializer(serializers.ModelSerializer):
@@ -24,23 +27,67 @@ class BlogPostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = BlogPost
-        fields = ['id', 'title', 'content', 'author', 'tags', 'created_at', 'updated_at']
+        fields = ['id', 'title', 'content', 'author', 'tags', 'comment_count', 'created_at', 'updated_at']
+        read_only_fields = ['comment_count']
 
     def create(self, validated_data):
         tags_data = validated_data.pop('tags')
         blog_post = BlogPost.objects.create(**validated_data)
-        for tag in tags_data:
-            blog_post.tags.add(tag)
+        blog_post.tags.add(*tags_data)  # One INSERT for all the links
         return blog_post
 
     def update(self, instance, validated_data):
-        tags_data = validated_data.pop('tags')
+        tags_data = validated_data.pop('tags', None)  # Absent from a PATCH that leaves tags alone
         instance.title = validated_data.get('title', instance.title)
         instance.content = validated_data.get('content', instance.content)
         instance.save()
 
-        # Update tags
-        instance.tags.clear()
-        for tag in tags_data:
-            instance.tags.add(tag)
+        if tags_data is not None:
+            # set() diffs against the current links: one remove() for the dropped tags and one
+            # add() for the new ones, and no writes (or m2m_changed) when nothing changed
+            instance.tags.set(tags_data)
         return instance
+
+
+
+
+
+
+class BlogPostImportListSerializer(serializers.ListSerializer):
+    """
+    Validates a whole bulk import payload: every item first, then the comment authors of
+    all items in one query, replacing each username with the user's id.
+    """
+
+    def validate(self, attrs):
+        comments = []
+        level, depth = [comment for item in attrs for comment in item['comments']], 0
+        while level:
+            if depth > MAX_DEPTH:
+                raise serializers.ValidationError(f"Comments can be nested at most {MAX_DEPTH} replies deep.")
+            comments.extend(level)
+            level, depth = [reply for comment in level for reply in comment['replies']], depth + 1
+
+        usernames = {comment['author'] for comment in comments if comment['author']}
+        users = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+        unknown = sorted(usernames - set(users))
+        if unknown:
+            raise serializers.ValidationError(f"Unknown comment authors: {', '.join(unknown)}.")
+        for comment in comments:
+            comment['author'] = users.get(comment['author'])
+        return attrs
+
+
+class BlogPostImportSerializer(serializers.ModelSerializer):
+    """
+    One post of a bulk import (see blogs.bulk.import_posts). Tags are given by name and
+    created when they don't exist yet; comments may nest replies.
+    """
+    tags = serializers.ListField(child=serializers.CharField(max_length=50), required=False, default=list)
+    comments = CommentImportSerializer(many=True, required=False, default=list)
+
+    class Meta:
+        model = BlogPost
+        fields = ['title', 'content', 'tags', 'comments']
+        list_serializer_class = BlogPostImportListSerializer
+
@@ -0,0 +1,87 @@
+from django.db.models.signals import post_save, pre_save, pre_delete, m2m_changed
+from django.dispatch import Signal, receiver
+from .cards import bump_tags_version
+from .models import BlogPost, Tag
+from .page_cache import bump_page_versions, list_scope, post_scope, tag_scope
+
+
+# Sent once by blogs.bulk.import_posts, which writes with bulk_create and so fires no
+# post_save/m2m_changed. Arguments: posts, comments, tags (every tag linked), new_tags.
+posts_imported = Signal()
+
+
+@receiver(m2m_changed, sender=BlogPost.tags.through)
+def invalidate_cards_on_tag_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    A post's tags changed (post.tags.add/remove/clear/set, or tag.blog_posts.* from the
+    tag's side): its cached cards now list the wrong tags, and the list, post and tag pages
+    showing it are stale.
+    """
+    if action == 'pre_clear':
+        # The links are gone by post_clear; note what they pointed at
+        related = instance.blog_posts if reverse else instance.tags
+        instance._cleared_pks = list(related.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    pks = getattr(instance, '_cleared_pks', []) if action == 'post_clear' else list(pk_set or ())
+
+    if reverse:
+        post_ids, tag_names = pks, [instance.name]
+    else:
+        post_ids, tag_names = [instance.pk], Tag.objects.filter(pk__in=pks).values_list('name', flat=True)
+    bump_tags_version(post_ids)
+    bump_page_versions(
+        [list_scope()] + [post_scope(pk) for pk in post_ids] + [tag_scope(name) for name in tag_names]
+    )
+
+
+@receiver(post_save, sender=BlogPost)
+def invalidate_pages_on_post_save(sender, instance, created, **kwargs):
+    # A new post has no tags yet; adding them goes through m2m_changed
+    tag_names = [] if created else instance.tags.values_list('name', flat=True)
+    bump_page_versions([list_scope(), post_scope(instance.pk)] + [tag_scope(name) for name in tag_names])
+
+
+@receiver(pre_delete, sender=BlogPost)
+def invalidate_pages_on_post_delete(sender, instance, **kwargs):
+    # Before the delete, while the post's tag links still exist
+    tag_names = instance.tags.values_list('name', flat=True)
+    bump_page_versions([list_scope(), post_scope(instance.pk)] + [tag_scope(name) for name in tag_names])
+
+
+@receiver(pre_save, sender=Tag)
+def remember_old_tag_name(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._old_name = Tag.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_cards_on_tag_rename(sender, instance, created, **kwargs):
+    if created:
+        return
+    post_ids = list(instance.blog_posts.values_list('pk', flat=True))
+    bump_tags_version(post_ids)
+    names = {instance.name, getattr(instance, '_old_name', None) or instance.name}
+    bump_page_versions([list_scope()] + [post_scope(pk) for pk in post_ids] + [tag_scope(name) for name in names])
+
+
+@receiver(pre_delete, sender=Tag)
+def invalidate_cards_on_tag_delete(sender, instance, **kwargs):
+    # The through rows are removed by the cascade without an m2m_changed signal
+    post_ids = list(instance.blog_posts.values_list('pk', flat=True))
+    bump_tags_version(post_ids)
+    bump_page_versions([list_scope(), tag_scope(instance.name)] + [post_scope(pk) for pk in post_ids])
+
+
+@receiver(posts_imported)
+def invalidate_pages_on_import(sender, posts, tags, **kwargs):
+    # New posts have no cached detail page or cards yet; lists and their tags' pages do
+    bump_page_versions([list_scope()] + [tag_scope(tag.name) for tag in tags])
+
+
+'''
+Cached pages are grouped into scopes (blogs.page_cache): every post list page, one post's
+detail page, and one tag's pages. A scope is invalidated by bumping its version, never by
+deleting keys, so invalidation costs one set_many however many pages were cached.
+'''
@@ -1,8 +1,18 @@
+import gzip
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import m2m_changed
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse, reverse_lazy
 from django.contrib.auth.models import User
 from blogs.models import BlogPost, Tag
 from blogs.forms import BlogPostForm
+from blogs.cards import get_tags_versions
+from blogs.page_cache import get_page_version, post_scope
+from comments.models import Comment
 
 class BlogPostListViewTests(TestCase):
 
@@ -24,6 +34,8 @@ class BlogPostListViewTests(TestCase):
             )
             post.tags.add(tag1, tag2)
 
+    def setUp(self):
+        cache.clear()  # Anonymous pages cached by an earlier test would come back without a context
 
     def test_view_accessible_by_name(self):
         response = self.client.get(reverse('blogs:post_list'))
@@ -353,6 +365,189 @@ class TagDetailViewPaginationTest(TestCase):
 
 
 
+class PostListQueryCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='12345')
+        cls.tags = [Tag.objects.create(name=f'Tag {i}') for i in range(3)]
+
+    def setUp(self):
+        cache.clear()  # Start every test with no cached post cards
+
+    def create_posts(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                post = BlogPost.objects.create(title=f'Post {i}', content='Content', author=self.user)
+                post.tags.add(*self.tags)
+
+    def test_post_list_query_count_is_constant(self):
+        # count, posts joined with authors, prefetched tags
+        self.create_posts(2)
+        with self.assertNumQueries(3):
+            self.client.get(reverse('blogs:post_list'))
+
+        self.create_posts(8)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('blogs:post_list'))
+        self.assertEqual(len(response.context['posts']), 10)
+
+    def test_tag_detail_query_count_is_constant(self):
+        # tag lookup, count, posts joined with authors, prefetched tags
+        self.create_posts(2)
+        with self.assertNumQueries(4):
+            self.client.get(reverse('blogs:tag_detail', kwargs={'name': 'Tag 0'}))
+
+        self.create_posts(8)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('blogs:tag_detail', kwargs={'name': 'Tag 0'}))
+        self.assertEqual(len(response.context['posts']), 10)
+
+
+
+
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='12345')
+        cls.tag = Tag.objects.create(name='django')
+        cls.post = BlogPost.objects.create(title='Cached Post', content='Content', author=cls.user)
+        cls.post.tags.add(cls.tag)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_list(self):
+        return self.client.get(reverse('blogs:post_list')).content.decode()
+
+    def test_cached_cards_skip_rendering_and_tag_queries(self):
+        # Logged in, so the page itself isn't served from the anonymous page cache
+        self.client.force_login(self.user)
+        self.get_list()
+        # session, user, count and posts: the card, tags included, comes from the cache
+        with self.assertNumQueries(4):
+            content = self.get_list()
+        self.assertIn('Cached Post', content)
+        self.assertIn('django', content)
+
+    def test_post_edit_refreshes_card(self):
+        self.get_list()
+        self.post.title = 'Edited Post'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        self.assertIn('Edited Post', self.get_list())
+
+    def test_tag_changes_refresh_card(self):
+        self.get_list()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.add(Tag.objects.create(name='python'))
+        self.assertIn('python', self.get_list())
+
+        self.tag.name = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.save()
+        content = self.get_list()
+        self.assertIn('renamed', content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.clear()
+        self.assertIn('No tags', self.get_list())
+
+    def test_tags_version_is_bumped_only_on_commit(self):
+        version = get_tags_versions([self.post])[self.post.pk]
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.post.tags.add(Tag.objects.create(name='python'))
+            # A card rendered before the commit still shows the old tags, under the old version
+            self.assertEqual(get_tags_versions([self.post])[self.post.pk], version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_tags_versions([self.post])[self.post.pk], version)
+
+    def test_tag_page_uses_its_own_card(self):
+        self.get_list()
+        response = self.client.get(reverse('blogs:tag_detail', kwargs={'name': 'django'}))
+        self.assertContains(response, '<article')
+
+
+
+
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='12345')
+        cls.tag = Tag.objects.create(name='django')
+        cls.post = BlogPost.objects.create(title='Cached Post', content='Content', author=cls.user)
+        cls.post.tags.add(cls.tag)
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [
+            reverse('blogs:post_list'),
+            reverse('blogs:post_detail', kwargs={'pk': self.post.pk}),
+            reverse('blogs:tag_detail', kwargs={'name': 'django'}),
+        ]
+
+    def test_repeat_anonymous_requests_skip_the_database(self):
+        for url in self.urls:
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(first.content, second.content)
+            self.assertEqual(first['ETag'], second['ETag'])
+            self.assertIn('Cookie', second['Vary'])
+
+    def test_matching_etag_gets_not_modified(self):
+        etag = self.client.get(self.urls[0])['ETag']
+        response = self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_comment_invalidates_list_and_detail(self):
+        for url in self.urls:
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=self.user, content='Fresh comment')
+        self.assertContains(self.client.get(self.urls[0]), '1 comment')
+        self.assertContains(self.client.get(self.urls[1]), 'Fresh comment')
+
+    def test_versions_are_bumped_only_on_commit(self):
+        self.client.get(self.urls[1])
+        version = get_page_version(post_scope(self.post.pk))
+        with self.captureOnCommitCallbacks() as callbacks:
+            Comment.objects.create(post=self.post, author=self.user, content='Uncommitted comment')
+            # A reader racing the commit still sees, and caches under, the old version
+            self.assertEqual(get_page_version(post_scope(self.post.pk)), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_page_version(post_scope(self.post.pk)), version)
+
+    def test_post_and_tag_changes_invalidate_tag_page(self):
+        self.client.get(self.urls[2])
+        self.post.title = 'Renamed Post'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        self.assertContains(self.client.get(self.urls[2]), 'Renamed Post')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.remove(self.tag)
+        self.assertNotContains(self.client.get(self.urls[2]), 'Renamed Post')
+
+    def test_logged_in_users_bypass_the_cache(self):
+        self.client.get(self.urls[1])
+        self.client.force_login(self.user)
+        response = self.client.get(self.urls[1])
+        self.assertIsNotNone(response.context)
+        self.assertNotIn('ETag', response)
+
+
+
+
+
+
+
+
 
 
 from rest_framework.test import APITestCase
@@ -408,6 +603,46 @@ class BlogPostAPITestCase(APITestCase):
         blog_post.refresh_from_db()
         self.assertEqual(blog_post.title, "Updated Blog Post")
 
+    def record_tag_changes(self):
+        actions = []
+
+        def receiver(sender, action, pk_set, **kwargs):
+            actions.append((action, sorted(pk_set or ())))
+        m2m_changed.connect(receiver, sender=BlogPost.tags.through)
+        self.addCleanup(m2m_changed.disconnect, receiver, sender=BlogPost.tags.through)
+        return actions
+
+    def test_update_with_unchanged_tags_writes_no_links(self):
+        blog_post = BlogPost.objects.create(title="Post", content="Content", author=self.user)
+        blog_post.tags.add(self.tag)
+        actions = self.record_tag_changes()
+        data = {"title": "Renamed", "content": "Content", "tags": [self.tag.name]}
+        response = self.client.put(f'/api/blogs/posts/{blog_post.id}/', data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(actions, [])
+
+    def test_update_applies_tag_difference(self):
+        kept, dropped, added = (Tag.objects.create(name=name) for name in ('kept', 'dropped', 'added'))
+        blog_post = BlogPost.objects.create(title="Post", content="Content", author=self.user)
+        blog_post.tags.add(kept, dropped)
+        actions = self.record_tag_changes()
+        data = {"title": "Post", "content": "Content", "tags": ['kept', 'added']}
+        response = self.client.put(f'/api/blogs/posts/{blog_post.id}/', data)
+        self.assertEqual(sorted(response.data['tags']), ['added', 'kept'])
+        self.assertEqual(
+            [action for action in actions if action[0].startswith('post_')],
+            [('post_remove', [dropped.pk]), ('post_add', [added.pk])],
+        )
+
+    def test_partial_update_without_tags_keeps_them(self):
+        blog_post = BlogPost.objects.create(title="Post", content="Content", author=self.user)
+        blog_post.tags.add(self.tag)
+        actions = self.record_tag_changes()
+        response = self.client.patch(f'/api/blogs/posts/{blog_post.id}/', {"title": "Patched"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tags'], [self.tag.name])
+        self.assertEqual(actions, [])
+
     def test_delete_blog_post(self):
         blog_post = BlogPost.objects.create(
             title="Delete Blog Post", content="This blog post will be deleted.",
@@ -417,3 +652,261 @@ class BlogPostAPITestCase(APITestCase):
         response = self.client.delete(f'/api/blogs/posts/{blog_post.id}/')
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(BlogPost.objects.count(), 0)
+
+
+
+
+
+
+
+
+
+class BlogPostCursorPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        for i in range(15):
+            BlogPost.objects.create(title=f'Post {i}', content='Content', author=self.user)
+
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get('/api/blogs/posts/')
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_cursor_pagination_walks_all_posts(self):
+        response = self.client.get('/api/blogs/posts/', {'pagination': 'cursor'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        first_page = [post['id'] for post in response.data['results']]
+
+        response = self.client.get(response.data['next'])
+        second_page = [post['id'] for post in response.data['results']]
+        self.assertIsNone(response.data['next'])
+
+        expected = list(BlogPost.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(first_page + second_page, expected)
+
+    def test_cursor_pages_are_stable_under_inserts(self):
+        response = self.client.get('/api/blogs/posts/', {'pagination': 'cursor'})
+        last_seen = response.data['results'][-1]['id']
+        BlogPost.objects.create(title='Newest post', content='Content', author=self.user)
+
+        response = self.client.get(response.data['next'])
+        self.assertNotIn(last_seen, [post['id'] for post in response.data['results']])
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_tags_cursor_pagination_orders_by_name(self):
+        for name in ['b', 'c', 'a']:
+            Tag.objects.create(name=name)
+        response = self.client.get('/api/blogs/tags/', {'pagination': 'cursor'})
+        self.assertEqual([tag['name'] for tag in response.data['results']], ['a', 'b', 'c'])
+
+
+
+
+
+
+
+
+
+class BlogPostConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(name='django')
+        self.post = BlogPost.objects.create(title='Post', content='Content', author=self.user)
+        self.post.tags.add(self.tag)
+
+    def assertNotModified(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        return response['ETag']
+
+    def test_unchanged_list_and_detail_are_not_modified(self):
+        for url in ('/api/blogs/posts/', f'/api/blogs/posts/{self.post.pk}/'):
+            self.assertNotModified(url)
+
+    def test_last_modified_is_honoured(self):
+        response = self.client.get(f'/api/blogs/posts/{self.post.pk}/')
+        response = self.client.get(f'/api/blogs/posts/{self.post.pk}/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changes_produce_a_new_etag(self):
+        url = f'/api/blogs/posts/{self.post.pk}/'
+        etag = self.assertNotModified(url)
+        Comment.objects.create(post=self.post, author=self.user, content='New comment')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['comment_count'], 1)
+
+        etag = response['ETag']
+        self.tag.name = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data['tags'], ['renamed'])
+
+    def test_deleting_a_post_changes_the_list_etag(self):
+        other = BlogPost.objects.create(title='Other', content='Content', author=self.user)
+        etag = self.assertNotModified('/api/blogs/posts/')
+        other.delete()
+        response = self.client.get('/api/blogs/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_list_has_no_last_modified(self):
+        response = self.client.get('/api/blogs/posts/')
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+
+
+
+
+
+
+
+
+class BlogPostExportTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(name='django')
+        for i in range(3):
+            post = BlogPost.objects.create(title=f'Post {i}', content='Content', author=self.user)
+            post.tags.add(tag)
+        comment = Comment.objects.create(post=post, author=self.user, content='Comment')
+        Comment.objects.create(post=post, author=self.user, parent=comment, content='Reply')
+
+    def read_lines(self, content):
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_export_streams_ndjson(self):
+        response = self.client.get('/api/blogs/posts/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = self.read_lines(b''.join(response.streaming_content))
+        self.assertEqual([record['title'] for record in records], ['Post 0', 'Post 1', 'Post 2'])
+        self.assertEqual(records[2]['tags'], ['django'])
+        comments = records[2]['comments']
+        self.assertEqual([comment['content'] for comment in comments], ['Comment', 'Reply'])
+        self.assertEqual(comments[1]['parent'], comments[0]['id'])
+
+    def test_export_gzips_when_accepted(self):
+        response = self.client.get('/api/blogs/posts/export/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        records = self.read_lines(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(len(records), 3)
+
+    async def test_export_is_an_async_stream_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/api/blogs/posts/export/')
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(self.read_lines(content)), 3)
+
+    def test_export_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.get('/api/blogs/posts/export/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+
+
+
+
+
+
+
+class BlogPostBulkImportTestCase(APITestCase):
+    url = '/api/blogs/posts/bulk/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.reader = User.objects.create_user(username='reader', password='testpass')
+        self.client.force_authenticate(self.user)
+        Tag.objects.create(name='django')
+
+    def payload(self, count=3):
+        return [
+            {
+                'title': f'Imported {i}',
+                'content': 'Migrated content',
+                'tags': ['django', 'imported'],
+                'comments': [
+                    {'author': 'reader', 'content': 'Nice post', 'replies': [
+                        {'content': 'Thanks', 'replies': [{'author': 'reader', 'content': 'Welcome'}]},
+                    ]},
+                    {'content': 'Author note'},
+                ],
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_import_creates_posts_tags_and_comment_trees(self):
+        response = self.client.post(self.url, self.payload(), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['posts']), 3)
+        self.assertEqual(response.data['comments'], 12)
+
+        post = BlogPost.objects.get(pk=response.data['posts'][0])
+        self.assertEqual(post.author, self.user)
+        self.assertEqual(sorted(post.tags.values_list('name', flat=True)), ['django', 'imported'])
+        self.assertEqual(Tag.objects.filter(name='imported').count(), 1)
+        self.assertEqual(post.comment_count, 4)
+
+        thread = list(post.comments.order_by('path'))
+        self.assertEqual([comment.content for comment in thread], ['Nice post', 'Thanks', 'Welcome', 'Author note'])
+        self.assertEqual([comment.depth for comment in thread], [0, 1, 2, 0])
+        self.assertEqual(thread[1].parent, thread[0])
+        self.assertEqual(thread[0].reply_count, 1)
+        self.assertEqual(thread[1].author, self.user)
+        self.assertEqual(thread[2].author, self.reader)
+
+    def test_bulk_import_runs_batched_side_effects(self):
+        from buzz.models import Buzz, UnreadBuzzCount
+        from search.backends import get_search_backend
+
+        response = self.client.post(self.url, self.payload(2), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # Comments by `reader` on the importer's posts buzz the importer, as single comments do
+        self.assertEqual(Buzz.objects.filter(user=self.user, trigger=self.reader).count(), 4)
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user.pk), 4)
+        self.assertCountEqual(
+            get_search_backend().search('migrated').values_list('pk', flat=True), response.data['posts'],
+        )
+
+    def test_bulk_import_uses_a_fixed_number_of_queries(self):
+        self.client.post(self.url, self.payload(2), format='json')
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, self.payload(2), format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, self.payload(40), format='json')
+        self.assertEqual(len(small), len(large))
+
+    def test_invalid_item_rejects_the_whole_import(self):
+        payload = self.payload(2)
+        payload[1]['title'] = ''
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('title', response.data[1])
+        self.assertFalse(BlogPost.objects.exists())
+
+    def test_unknown_comment_author_is_rejected(self):
+        payload = self.payload(1)
+        payload[0]['comments'][0]['author'] = 'nobody'
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('nobody', str(response.data))
+        self.assertFalse(BlogPost.objects.exists())
+
+    def test_bulk_import_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(self.url, self.payload(1), format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
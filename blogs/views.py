@@ -20,29 +20,45 @@ from django.urls import reverse_lazy
 from .models import BlogPost, Tag
 from .forms import BlogPostForm
 from django.shortcuts import get_object_or_404
+from comments.tree import build_comment_tree
+from .cards import attach_cards, get_tags_versions
+from .page_cache import AnonymousPageCacheMixin, get_page_version, list_scope, post_scope, tag_scope
 
 # ListView to display all published blog posts
-class BlogPostListView(ListView):
+class BlogPostListView(AnonymousPageCacheMixin, ListView):
     model = BlogPost
     template_name = 'blogs/blogpost_list.html'  # Specify the template to use
     context_object_name = 'posts'  # Name of the context variable to use in the template
     paginate_by = 10  # Number of posts per page
 
+    def get_page_cache_scope(self):
+        return list_scope()
+
     def get_queryset(self):
-        return BlogPost.objects.order_by('-created_at')
+        # Tags are only loaded for cards that aren't cached yet (see attach_cards)
+        return BlogPost.objects.select_related('author').order_by('-created_at')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        attach_cards(context['posts'], 'blogs/post_card.html')
+        return context
 
 
 
 
-class BlogPostDetailView(DetailView):
+class BlogPostDetailView(AnonymousPageCacheMixin, DetailView):
     model = BlogPost
+    queryset = BlogPost.objects.with_card_relations()
     template_name = 'blogs/blogpost_detail.html'
     context_object_name = 'post'
 
+    def get_page_cache_scope(self):
+        return post_scope(self.kwargs['pk'])
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Fetch only top-level comments (comments with no parent)
-        context['comments'] = self.object.comments.filter(parent__isnull=True)
+        # Top-level comments, each carrying its replies in `children`
+        context['comments'] = build_comment_tree(self.object)
         return context
 
 
@@ -114,19 +130,23 @@ class BlogPostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 
 
 
-class TagDetailView(ListView):
+class TagDetailView(AnonymousPageCacheMixin, ListView):
     model = BlogPost
     template_name = 'blogs/tag_detail.html'  # Specify the template to use
     context_object_name = 'posts'
     paginate_by = 10  # If you want to paginate the posts
 
+    def get_page_cache_scope(self):
+        return tag_scope(self.kwargs['name'])
+
     def get_queryset(self):
         self.tag = get_object_or_404(Tag, name=self.kwargs['name'])
-        return BlogPost.objects.filter(tags=self.tag).order_by('-created_at')
+        return BlogPost.objects.filter(tags=self.tag).select_related('author').order_by('-created_at')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['tag'] = self.tag
+        attach_cards(context['posts'], 'blogs/tag_post_card.html')
         return context
 
 
@@ -138,12 +158,20 @@ is to use viewsets, which automatically provide implementations for CRUD operati
 
 
 from rest_framework import viewsets
-from .serializers import BlogPostSerializer, TagSerializer
+from .serializers import BlogPostImportSerializer, BlogPostSerializer, TagSerializer
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from rest_framework.authentication import SessionAuthentication, TokenAuthentication
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.decorators import action
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from core.conditional import ConditionalGetMixin
+from core.streaming import is_asgi_request, iterate_in_thread
+from .bulk import BULK_IMPORT_MAX_POSTS, import_posts
+from .export import EXPORT_CHUNK_SIZE, export_posts, ndjson_lines
 
 
 
@@ -175,12 +203,55 @@ logged-in user as the author of a blog post.
 
 
 
-class BlogPostViewSet(viewsets.ModelViewSet):
-    queryset = BlogPost.objects.all().order_by('-created_at')
+class BlogPostViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = BlogPost.objects.with_card_relations().order_by('-created_at', '-id')
     serializer_class = BlogPostSerializer
     authentication_classes = [JWTAuthentication, SessionAuthentication]  # Use JWTAuthentication
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthenticated]  # Ensure permissions are set properly
 
+    list_validator_fields = ('updated_at', 'comment_count')
+
+    def get_list_validators(self, rows):
+        # Tag links and renames don't touch post rows; the list page version is bumped for both
+        return super().get_list_validators(rows), get_page_version(list_scope())
+
+    def get_object_validators(self, pk):
+        post = BlogPost.objects.filter(pk=pk).values('pk', 'updated_at', 'comment_count').first()
+        if post is None:
+            return None
+        tags_version = get_tags_versions([BlogPost(pk=post['pk'])])[post['pk']]
+        return (post, tags_version), post['updated_at']
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def export(self, request):
+        """
+        Stream every post with its tags and comments as NDJSON (one post per line), gzipped
+        on the fly when the client accepts it. Under ASGI the lines are pulled one chunk of
+        posts at a time through a worker thread.
+        """
+        lines = ndjson_lines(export_posts())
+        gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        content = compress_sequence(lines) if gzip else lines
+        if is_asgi_request(request):
+            content = iterate_in_thread(content, EXPORT_CHUNK_SIZE)
+        response = StreamingHttpResponse(content, content_type='application/x-ndjson')
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        response['Content-Disposition'] = 'attachment; filename="posts.ndjson"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='bulk', serializer_class=BlogPostImportSerializer)
+    def bulk_import(self, request):
+        """
+        Create up to BULK_IMPORT_MAX_POSTS posts from a JSON list, all or nothing. Every item
+        is validated before anything is written.
+        """
+        serializer = self.get_serializer(data=request.data, many=True, allow_empty=False, max_length=BULK_IMPORT_MAX_POSTS)
+        serializer.is_valid(raise_exception=True)
+        posts, comments = import_posts(request.user, serializer.validated_data)
+        return Response({'posts': [post.pk for post in posts], 'comments': len(comments)}, status=status.HTTP_201_CREATED)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -201,7 +272,8 @@ class TagViewSet(viewsets.ModelViewSet):
     A viewset for viewing and editing tag instances.
     """
     serializer_class = TagSerializer
-    queryset = Tag.objects.all()
+    queryset = Tag.objects.order_by('name')
+    cursor_ordering = ('name',)  # Tags have no created_at; page by their unique name
     authentication_classes = [JWTAuthentication, SessionAuthentication]  # Use JWTAuthentication
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthenticated]  # Ensure permissions are set properly
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Buzz
+from .models import Buzz, UnreadBuzzCount
 
 class BuzzAdmin(admin.ModelAdmin):
     list_display = ('user', 'trigger', 'post', 'comment', 'is_read', 'created_at')
@@ -7,7 +7,9 @@ class BuzzAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'trigger__username', 'post__title', 'comment__content')
 
     def mark_as_read(self, request, queryset):
+        user_ids = set(queryset.filter(is_read=False).values_list('user_id', flat=True))
         queryset.update(is_read=True)
+        UnreadBuzzCount.recount(user_ids)
     mark_as_read.short_description = "Mark selected buzzes as read"
 
     actions = [mark_as_read]
@@ -21,7 +23,7 @@ list_filter: This tuple allows filtering buzzes by is_read status and created_at
 
 search_fields: This tuple enables searching through the buzzes by user’s username, trigger’s username, post title, and comment content, improving the admin interface's usability.
 
-mark_as_read: This method defines a custom admin action that allows you to mark multiple buzzes as read. It updates the is_read field to True for the selected buzzes.
+mark_as_read: This method defines a custom admin action that allows you to mark multiple buzzes as read. It updates the is_read field to True for the selected buzzes and recounts the unread totals of the affected users.
 
 actions: This list includes the mark_as_read action in the admin interface, so you can apply it to selected items.
 '''
\ No newline at end of file
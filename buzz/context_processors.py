@@ -1,7 +1,19 @@
-from .models import Buzz
+from django.utils.functional import SimpleLazyObject
+from core.streaming import is_asgi_request
+from .models import UnreadBuzzCount
 
 def unread_buzz_count(request):
-    if request.user.is_authenticated:
-        count = Buzz.objects.filter(user=request.user, is_read=False).count()
-        return {'unread_buzz_count': count}
-    return {'unread_buzz_count': 0}
+    """
+    Expose the unread buzz count lazily: nothing is looked up unless a template
+    reads it, and the value is shared by every template rendered for the request.
+
+    `buzz_stream_available` says whether the live stream (BuzzStreamView) can be opened,
+    which takes an ASGI server.
+    """
+    if not request.user.is_authenticated:
+        return {'unread_buzz_count': 0}
+
+    if not hasattr(request, '_unread_buzz_count'):
+        user_id = request.user.pk
+        request._unread_buzz_count = SimpleLazyObject(lambda: UnreadBuzzCount.get_for_user(user_id))
+    return {'unread_buzz_count': request._unread_buzz_count, 'buzz_stream_available': is_asgi_request(request)}
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from .models import UnreadBuzzCount
+
+
+# Events queued per connection before a slow client is told to resync instead
+STREAM_QUEUE_SIZE = 100
+
+# Seconds of silence before a comment line is sent, so proxies keep the connection open
+STREAM_HEARTBEAT_INTERVAL = 15
+
+# How long browsers wait before reconnecting a dropped stream, in milliseconds
+STREAM_RETRY = 5000
+
+RESYNC = object()
+
+
+class Subscriber:
+    """One open stream: a bounded queue living on the event loop that serves it."""
+
+    def __init__(self, user_id, loop, maxsize=STREAM_QUEUE_SIZE):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def offer(self, event):
+        # Runs on self.loop. A client that can't keep up gets one resync, not an unbounded backlog.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class BuzzBroker:
+    """
+    In-process pub/sub from buzz delivery (any thread) to the SSE streams (async). Only
+    streams served by the same process see an event; others catch up through the unread
+    count every stream starts with.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        subscriber = Subscriber(user_id, asyncio.get_running_loop())
+        with self.lock:
+            self.subscribers[user_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            subscribers = self.subscribers.get(subscriber.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.subscribers[subscriber.user_id]
+
+    def publish(self, user_id, event):
+        with self.lock:
+            subscribers = list(self.subscribers.get(user_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+            except RuntimeError:  # Its event loop has closed
+                self.unsubscribe(subscriber)
+
+
+broker = BuzzBroker()
+
+
+def sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+async def buzz_events(user_id):
+    """
+    Server-sent events for one user: the unread count on connect, then every new buzz as it
+    is delivered, each burst followed by the new unread count, and a heartbeat comment
+    whenever the stream has been quiet for STREAM_HEARTBEAT_INTERVAL seconds.
+    """
+    subscriber = broker.subscribe(user_id)
+    get_unread_count = sync_to_async(UnreadBuzzCount.get_for_user)
+    try:
+        yield f'retry: {STREAM_RETRY}\n' + sse('unread', {'unread_count': await get_unread_count(user_id)})
+        while True:
+            try:
+                events = [await asyncio.wait_for(subscriber.queue.get(), STREAM_HEARTBEAT_INTERVAL)]
+            except asyncio.TimeoutError:
+                yield ': heartbeat\n\n'
+                continue
+            while not subscriber.queue.empty():
+                events.append(subscriber.queue.get_nowait())
+            chunks = [sse('resync', {}) if event is RESYNC else sse('buzz', event) for event in events]
+            chunks.append(sse('unread', {'unread_count': await get_unread_count(user_id)}))
+            yield ''.join(chunks)
+    finally:
+        broker.unsubscribe(subscriber)
@@ -0,0 +1,36 @@
+import gzip
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from buzz.retention import ARCHIVE_BATCH_SIZE, archive_read_buzzes
+
+
+class Command(BaseCommand):
+    help = (
+        "Move read buzzes older than --days out of the buzz table, in batches of --batch-size "
+        "rows per transaction: into the ArchivedBuzz table, or appended to an NDJSON file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.BUZZ_RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--output', '-o', help="Append NDJSON to this file instead of the archive table.")
+        parser.add_argument('--gzip', action='store_true', help="Gzip the --output file (appended as a new gzip member).")
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--days must be 0 or more and --batch-size at least 1.")
+        if options['gzip'] and not options['output']:
+            raise CommandError("--gzip needs --output.")
+        older_than = timedelta(days=options['days'])
+
+        if not options['output']:
+            archived = archive_read_buzzes(older_than, options['batch_size'])
+            destination = "the archive table"
+        else:
+            opener = gzip.open if options['gzip'] else open
+            with opener(options['output'], 'ab') as output:
+                archived = archive_read_buzzes(older_than, options['batch_size'], output=output)
+            destination = options['output']
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} read buzzes to {destination}."))
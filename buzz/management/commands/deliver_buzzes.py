@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from buzz.models import BuzzOutbox
+from buzz.outbox import OUTBOX_BATCH_SIZE, deliver_all
+
+
+class Command(BaseCommand):
+    help = "Deliver every buzz still queued in the outbox (e.g. after a crash, or with BUZZ_ASYNC_DELIVERY off)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        delivered = deliver_all(options['batch_size'])
+        remaining = BuzzOutbox.objects.count()
+        self.stdout.write(self.style.SUCCESS(f"Delivered {delivered} queued comments; {remaining} still queued."))
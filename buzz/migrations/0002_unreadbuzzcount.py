@@ -0,0 +1,39 @@
+# Generated by Django 5.1 on 2026-10-18 17:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_unread_counts(apps, schema_editor):
+    Buzz = apps.get_model('buzz', 'Buzz')
+    UnreadBuzzCount = apps.get_model('buzz', 'UnreadBuzzCount')
+    totals = Buzz.objects.filter(is_read=False).order_by().values_list('user_id').annotate(total=Count('id'))
+    UnreadBuzzCount.objects.bulk_create(
+        [UnreadBuzzCount(user_id=user_id, unread_count=total) for user_id, total in totals],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buzz', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadBuzzCount',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_buzz_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Unread Buzz Count',
+                'verbose_name_plural': 'Unread Buzz Counts',
+            },
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
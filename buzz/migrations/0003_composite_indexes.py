@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-18 17:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0005_blogpost_blogpost_created_id_idx'),
+        ('buzz', '0002_unreadbuzzcount'),
+        ('comments', '0005_comment_comment_created_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='buzz',
+            index=models.Index(fields=['user', '-created_at'], name='buzz_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='buzz',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', '-created_at'], name='buzz_user_unread_idx'),
+        ),
+    ]
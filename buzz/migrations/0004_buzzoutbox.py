@@ -0,0 +1,27 @@
+# Generated by Django 5.1 on 2026-10-18 18:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buzz', '0003_composite_indexes'),
+        ('comments', '0006_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuzzOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('comment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='comments.comment')),
+            ],
+            options={
+                'verbose_name': 'Buzz Outbox Entry',
+                'verbose_name_plural': 'Buzz Outbox',
+            },
+        ),
+    ]
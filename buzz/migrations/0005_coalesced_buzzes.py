@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-18 18:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0005_blogpost_blogpost_created_id_idx'),
+        ('buzz', '0004_buzzoutbox'),
+        ('comments', '0006_composite_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buzz',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='buzz',
+            name='window_start',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='buzz',
+            constraint=models.UniqueConstraint(fields=('user', 'post', 'window_start'), name='buzz_user_post_window_uniq'),
+        ),
+    ]
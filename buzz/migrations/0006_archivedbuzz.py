@@ -0,0 +1,55 @@
+# Generated by Django 5.1 on 2026-10-18 18:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0005_blogpost_blogpost_created_id_idx'),
+        ('buzz', '0005_coalesced_buzzes'),
+        ('comments', '0006_composite_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBuzz',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('comment_count', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Buzz',
+                'verbose_name_plural': 'Archived Buzzes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='buzz',
+            index=models.Index(condition=models.Q(('is_read', True)), fields=['created_at'], name='buzz_read_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedbuzz',
+            name='comment',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='comments.comment'),
+        ),
+        migrations.AddField(
+            model_name='archivedbuzz',
+            name='post',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='blogs.blogpost'),
+        ),
+        migrations.AddField(
+            model_name='archivedbuzz',
+            name='trigger',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedbuzz',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1 on 2026-10-18 19:25
+
+import buzz.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buzz', '0006_archivedbuzz'),
+        ('comments', '0006_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='buzz',
+            name='comment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=buzz.models.keep_digests, to='comments.comment'),
+        ),
+    ]
@@ -1,24 +1,244 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.conf import settings
 from blogs.models import BlogPost
 from comments.models import Comment
 
+
+UNREAD_COUNT_CACHE_TIMEOUT = 60 * 15
+
+
+def unread_count_cache_key(user_id):
+    return f'buzz:unread_count:{user_id}'
+
+def parse_read_position(value):
+    """
+    Parse a Buzz.read_position string into a (created_at, id) pair; ValueError if it isn't one.
+    """
+    created_at, _, pk = value.rpartition(',')
+    created_at = parse_datetime(created_at)
+    if created_at is None or timezone.is_naive(created_at) or not pk.isdigit():
+        raise ValueError(f'{value!r} is not a buzz position.')
+    return created_at, int(pk)
+
+
+def keep_digests(collector, field, sub_objs, using):
+    """
+    on_delete for Buzz.comment. A buzz for a single comment is deleted with it, but a digest
+    also stands for the other comments of its window: it only loses the link and one from
+    its count.
+    """
+    digests = list(sub_objs.filter(comment_count__gt=1).values_list('pk', flat=True))
+    if digests:
+        kept = field.model._base_manager.using(using).filter(pk__in=digests)
+        collector.add_field_update(field, None, kept)
+        collector.add_field_update(field.model._meta.get_field('comment_count'), F('comment_count') - 1, kept)
+    models.CASCADE(collector, field, sub_objs.exclude(pk__in=digests), using)
+
+
 class Buzz(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='buzzes')
     trigger = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='triggered_buzzes')
     post = models.ForeignKey(BlogPost, on_delete=models.CASCADE)
-    comment = models.ForeignKey(Comment, on_delete=models.CASCADE)
+    # Null once a digest's latest comment is deleted (see keep_digests)
+    comment = models.ForeignKey(Comment, on_delete=keep_digests, null=True, blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # With BUZZ_COALESCE_WINDOW set, every comment on a post within one window is folded into a
+    # single buzz: `trigger`/`comment` are the latest, comment_count how many were folded in,
+    # and created_at the latest activity. window_start is null for one-buzz-per-comment rows.
+    comment_count = models.PositiveIntegerField(default=1)
+    window_start = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Buzz'
         verbose_name_plural = 'Buzzes'
+        constraints = [
+            # The upsert target of coalesced buzzes (NULL windows never conflict)
+            models.UniqueConstraint(fields=['user', 'post', 'window_start'], name='buzz_user_post_window_uniq'),
+        ]
+        indexes = [
+            # A user's buzz list, newest first
+            models.Index(fields=['user', '-created_at'], name='buzz_user_created_idx'),
+            # Unread buzzes per user; read buzzes (the bulk of the table) are left out
+            models.Index(
+                fields=['user', '-created_at'],
+                name='buzz_user_unread_idx',
+                condition=models.Q(is_read=False),
+            ),
+            # Read buzzes oldest first, the order buzz.retention archives them in
+            models.Index(fields=['created_at'], name='buzz_read_created_idx', condition=models.Q(is_read=True)),
+        ]
 
     def __str__(self):
         return f'Buzz for {self.user.username} on {self.post.title} by {self.trigger.username}'
 
+    @property
+    def read_position(self):
+        """'<created_at>,<id>': where this buzz sits in the newest-first list, for mark_read(up_to=...)."""
+        return f'{self.created_at.isoformat()},{self.pk}'
+
     def mark_as_read(self):
+        # Writes is_read alone, and only if still unread, so two concurrent reads only decrement the counter once
+        Buzz.mark_read(self.user_id, pk=self.pk)
         self.is_read = True
-        self.save()
+
+    @classmethod
+    def mark_read(cls, user_id, pk=None, up_to=None):
+        """
+        Mark a user's unread buzzes read in one `UPDATE ... WHERE user_id = ? AND is_read = false`:
+        just buzz `pk`, or every buzz at or before `up_to`, a (created_at, id) pair from
+        parse_read_position, or all of them. The rows changed come off the user's unread
+        count. Returns how many were marked.
+
+        The bound is on created_at rather than the id because a digest revived by new
+        activity keeps its id but moves to the top of the list (see buzz.outbox).
+        """
+        queryset = cls.objects.filter(user_id=user_id, is_read=False)
+        if pk is not None:
+            queryset = queryset.filter(pk=pk)
+        if up_to is not None:
+            created_at, up_to_id = up_to
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lte=up_to_id))
+        updated = queryset.update(is_read=True)
+        if updated:
+            UnreadBuzzCount.adjust(user_id, -updated)
+        return updated
+
+
+
+
+
+
+class UnreadBuzzCount(models.Model):
+    """
+    Per-user count of unread buzzes, so the navbar badge is a primary-key lookup
+    instead of a COUNT(*) over the user's buzzes.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='unread_buzz_counter')
+    unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Unread Buzz Count'
+        verbose_name_plural = 'Unread Buzz Counts'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.unread_count} unread'
+
+    @classmethod
+    def adjust(cls, user_id, delta):
+        """
+        Atomically add `delta` to a user's unread count, creating the row on first use.
+        Decrements never take the count below zero.
+        """
+        queryset = cls.objects.filter(user_id=user_id)
+        if delta < 0:
+            queryset = queryset.filter(unread_count__gte=-delta)
+        if not queryset.update(unread_count=F('unread_count') + delta) and delta > 0:
+            counter, created = cls.objects.get_or_create(user_id=user_id, defaults={'unread_count': delta})
+            if not created:
+                cls.objects.filter(user_id=user_id).update(unread_count=F('unread_count') + delta)
+        cls.invalidate_cache([user_id])
+
+    @classmethod
+    def get_for_user(cls, user_id):
+        """
+        Read a user's unread count from the cache, falling back to the database on a miss.
+        """
+        key = unread_count_cache_key(user_id)
+        count = cache.get(key)
+        if count is None:
+            count = cls.count_for_user(user_id)
+            cache.set(key, count, UNREAD_COUNT_CACHE_TIMEOUT)
+        return count
+
+    @classmethod
+    def count_for_user(cls, user_id):
+        """Read a user's unread count from the database, as seen by the current transaction."""
+        return cls.objects.filter(user_id=user_id).values_list('unread_count', flat=True).first() or 0
+
+    @classmethod
+    def recount(cls, user_ids=None):
+        """
+        Recompute unread counts from the Buzz table, for the given users or for everyone.
+        """
+        unread = Buzz.objects.filter(is_read=False)
+        counters = cls.objects.all()
+        if user_ids is not None:
+            unread = unread.filter(user_id__in=user_ids)
+            counters = counters.filter(user_id__in=user_ids)
+        totals = dict(unread.order_by().values_list('user_id').annotate(total=Count('id')))
+
+        counters.exclude(user_id__in=totals).update(unread_count=0)
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, unread_count=total) for user_id, total in totals.items()],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['unread_count'],
+        )
+
+        if user_ids is None:
+            user_ids = cls.objects.values_list('user_id', flat=True)
+        cls.invalidate_cache(user_ids)
+
+    @classmethod
+    def invalidate_cache(cls, user_ids):
+        """
+        Drop these users' cached counts once the current transaction commits (right away
+        outside one). Dropped earlier, a concurrent get_for_user would cache the old count.
+        """
+        keys = [unread_count_cache_key(user_id) for user_id in user_ids]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+
+
+
+
+class BuzzOutbox(models.Model):
+    """
+    A new comment whose buzz has not been delivered yet. Rows are written in the comment's
+    own transaction and turned into buzzes in batches by buzz.outbox, so a queued buzz
+    survives a restart and the comment request never waits for notification work.
+    """
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Buzz Outbox Entry'
+        verbose_name_plural = 'Buzz Outbox'
+
+    def __str__(self):
+        return f'Pending buzz for comment {self.comment_id}'
+
+
+
+
+
+
+class ArchivedBuzz(models.Model):
+    """
+    A read buzz moved out of the Buzz table by buzz.retention, keeping its id. The foreign
+    keys carry no database constraint, so archived rows neither block nor follow deletes
+    of the users, posts and comments they point at.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    trigger = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    post = models.ForeignKey(BlogPost, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    comment = models.ForeignKey(Comment, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    comment_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Archived Buzz'
+        verbose_name_plural = 'Archived Buzzes'
+
+    def __str__(self):
+        return f'Archived buzz {self.pk} for user {self.user_id}'
+
@@ -0,0 +1,208 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from comments.models import Comment
+from .live import broker
+from .models import Buzz, BuzzOutbox, UnreadBuzzCount
+from .retention import run_retention_if_due
+
+
+logger = logging.getLogger('buzz.outbox')
+
+OUTBOX_BATCH_SIZE = 500
+
+# After a wake-up the worker waits this long before reading the outbox, so a burst of
+# comments is delivered as one batch
+OUTBOX_COALESCE_DELAY = 0.2
+
+# Rows nobody woke the worker for (queued by a process that died) are picked up this often
+OUTBOX_POLL_INTERVAL = 60
+
+
+def enqueue(comment):
+    """Queue a new comment's buzz; called from the comment's post_save."""
+    BuzzOutbox.objects.create(comment=comment)
+    if settings.BUZZ_ASYNC_DELIVERY:
+        # The worker can only see the row once the comment's transaction has committed
+        transaction.on_commit(dispatcher.wake)
+    else:
+        deliver_pending()
+
+
+def window_start(moment, window):
+    """Start of the fixed `window`-second bucket `moment` falls in."""
+    return datetime.fromtimestamp(moment.timestamp() // window * window, tz=timezone.utc)
+
+
+def upsert_buzzes(buzzes):
+    """
+    INSERT ... ON CONFLICT (user, post, window_start) DO UPDATE, so a digest buzz that already
+    exists gets the new comments added to its counter, the latest trigger and comment, and
+    is marked unread again. Django's update_conflicts can only overwrite columns, not add to
+    them, hence the SQL; the syntax is the same on PostgreSQL and SQLite.
+    """
+    names = ['user', 'trigger', 'post', 'comment', 'is_read', 'created_at', 'comment_count', 'window_start']
+    fields = [Buzz._meta.get_field(name) for name in names]
+    quote = connection.ops.quote_name
+    table = quote(Buzz._meta.db_table)
+    columns = {name: quote(field.column) for name, field in zip(names, fields)}
+    assignments = ['%s = EXCLUDED.%s' % (columns[name], columns[name]) for name in ('trigger', 'comment', 'is_read', 'created_at')]
+    assignments.append('%s = %s.%s + EXCLUDED.%s' % ((columns['comment_count'], table) + (columns['comment_count'],) * 2))
+    row = '(%s)' % ', '.join(['%s'] * len(fields))
+
+    for start in range(0, len(buzzes), OUTBOX_BATCH_SIZE):
+        batch = buzzes[start:start + OUTBOX_BATCH_SIZE]
+        sql = 'INSERT INTO %s (%s) VALUES %s ON CONFLICT (%s) DO UPDATE SET %s' % (
+            table,
+            ', '.join(columns.values()),
+            ', '.join([row] * len(batch)),
+            ', '.join(columns[name] for name in ('user', 'post', 'window_start')),
+            ', '.join(assignments),
+        )
+        params = [field.get_db_prep_save(getattr(buzz, field.attname), connection) for buzz in batch for field in fields]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+def publish_on_commit(buzzes):
+    # Upserted digests have no id at this point; clients fetch the list for the details
+    events = [
+        (buzz.user_id, {'id': buzz.pk, 'post': buzz.post_id, 'comment': buzz.comment_id, 'trigger': buzz.trigger_id})
+        for buzz in buzzes
+    ]
+
+    def publish():
+        for user_id, event in events:
+            broker.publish(user_id, event)
+    transaction.on_commit(publish)
+
+
+def create_buzzes(comments):
+    """
+    Create the buzzes for new comments, given as (comment_id, author_id, post_id,
+    post_author_id, created_at) tuples. Only comments on someone else's post buzz the post's
+    author.
+
+    By default that is one bulk_create and one counter update per recipient. With
+    BUZZ_COALESCE_WINDOW set, the comments are first folded per (recipient, post, window)
+    and upserted into the digest buzzes, and the recipients' unread counts are recounted
+    (an upsert doesn't say whether it revived a read buzz).
+    """
+    comments = [comment for comment in comments if comment[1] != comment[3]]
+    if not comments:
+        return
+    window = settings.BUZZ_COALESCE_WINDOW
+    if not window:
+        buzzes = Buzz.objects.bulk_create([
+            Buzz(user_id=post_author_id, trigger_id=author_id, post_id=post_id, comment_id=comment_id)
+            for comment_id, author_id, post_id, post_author_id, created_at in comments
+        ])
+        for user_id, count in Counter(buzz.user_id for buzz in buzzes).items():
+            UnreadBuzzCount.adjust(user_id, count)
+        publish_on_commit(buzzes)
+        return
+
+    folded = {}
+    for comment_id, author_id, post_id, post_author_id, created_at in sorted(comments, key=lambda comment: (comment[4], comment[0])):
+        key = (post_author_id, post_id, window_start(created_at, window))
+        buzz = folded.get(key)
+        if buzz is None:
+            buzz = folded[key] = Buzz(user_id=post_author_id, post_id=post_id, window_start=key[2], comment_count=0)
+        # Oldest first, so the latest comment of the window wins
+        buzz.trigger_id, buzz.comment_id, buzz.created_at = author_id, comment_id, created_at
+        buzz.comment_count += 1
+    upsert_buzzes(list(folded.values()))
+    UnreadBuzzCount.recount({buzz.user_id for buzz in folded.values()})
+    publish_on_commit(folded.values())
+
+
+def deliver_pending(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Turn up to `batch_size` queued comments into buzzes (create_buzzes), then drop their
+    outbox rows, all in one transaction. Returns the number of rows taken off the queue.
+
+    On PostgreSQL the rows are locked with SKIP LOCKED, so workers in several processes
+    never deliver the same comment twice.
+    """
+    with transaction.atomic():
+        entries = list(
+            BuzzOutbox.objects.select_for_update(skip_locked=True).order_by('pk').values_list('pk', 'comment_id')[:batch_size]
+        )
+        if not entries:
+            return 0
+        create_buzzes(
+            Comment.objects.filter(pk__in=[comment_id for pk, comment_id in entries]).order_by('pk').values_list(
+                'pk', 'author_id', 'post_id', 'post__author_id', 'created_at',
+            )
+        )
+        BuzzOutbox.objects.filter(pk__in=[pk for pk, comment_id in entries]).delete()
+    return len(entries)
+
+
+def deliver_all(batch_size=OUTBOX_BATCH_SIZE):
+    delivered = 0
+    while True:
+        taken = deliver_pending(batch_size)
+        delivered += taken
+        if taken < batch_size:
+            return delivered
+
+
+class BuzzDispatcher:
+    """
+    Background thread draining the buzz outbox. start() runs it once per process (so also
+    after a fork); it is called on each process's first request (see buzz.signals) and by
+    wake(). The thread first drains whatever an earlier run left behind, then sleeps until
+    woken by a committed comment or until the poll interval passes. Each pass also runs the
+    buzz retention job when BUZZ_RETENTION_INTERVAL says it is due.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.thread = None
+        self.pid = None
+
+    def running(self):
+        return self.thread is not None and self.pid == os.getpid() and self.thread.is_alive()
+
+    def start(self):
+        if self.running():
+            return
+        with self.lock:
+            if not self.running():
+                self.pid = os.getpid()
+                self.thread = threading.Thread(target=self.run, name='buzz-dispatcher', daemon=True)
+                self.thread.start()
+
+    def wake(self):
+        self.start()
+        self.event.set()
+
+    def run(self):
+        while True:
+            time.sleep(OUTBOX_COALESCE_DELAY)
+            close_old_connections()
+            try:
+                delivered = deliver_all()
+                if delivered:
+                    logger.debug("Delivered %d queued buzzes", delivered)
+                archived = run_retention_if_due()
+                if archived:
+                    logger.info("Archived %d read buzzes", archived)
+            except Exception:
+                # The rows stay queued; the next wake-up or poll retries them
+                logger.exception("Buzz delivery failed")
+            finally:
+                close_old_connections()
+            self.event.wait(OUTBOX_POLL_INTERVAL)
+            self.event.clear()
+
+
+dispatcher = BuzzDispatcher()
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from blogs.export import ndjson_lines
+from .models import ArchivedBuzz, Buzz
+
+
+ARCHIVE_BATCH_SIZE = 1000
+
+RETENTION_LOCK_KEY = 'buzz:retention:lock'
+
+ARCHIVE_FIELDS = ('id', 'user', 'trigger', 'post', 'comment', 'comment_count', 'created_at')
+
+
+def archive_read_buzzes(older_than=None, batch_size=ARCHIVE_BATCH_SIZE, output=None):
+    """
+    Move read buzzes created before `older_than` ago (BUZZ_RETENTION_DAYS by default) out
+    of the Buzz table, oldest first: into ArchivedBuzz, or as NDJSON lines written to the
+    binary file `output`. Returns how many were archived.
+
+    Each batch of at most `batch_size` rows is archived and deleted in its own transaction,
+    so locks and undo stay bounded however large the backlog is. Unread buzzes are never
+    touched, so unread counts don't change.
+    """
+    if older_than is None:
+        older_than = timedelta(days=settings.BUZZ_RETENTION_DAYS)
+    cutoff = timezone.now() - older_than
+    columns = ('pk', 'user_id', 'trigger_id', 'post_id', 'comment_id', 'comment_count', 'created_at')
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Buzz.objects.select_for_update(skip_locked=True)
+                .filter(is_read=True, created_at__lt=cutoff)
+                .order_by('created_at', 'pk')
+                .values_list(*columns)[:batch_size]
+            )
+            if not rows:
+                return archived
+            if output is None:
+                ArchivedBuzz.objects.bulk_create([
+                    ArchivedBuzz(
+                        id=pk, user_id=user_id, trigger_id=trigger_id, post_id=post_id, comment_id=comment_id,
+                        comment_count=comment_count, created_at=created_at,
+                    )
+                    for pk, user_id, trigger_id, post_id, comment_id, comment_count, created_at in rows
+                ])
+            else:
+                # Written before the delete commits: a failure can repeat lines, never lose them
+                for line in ndjson_lines(dict(zip(ARCHIVE_FIELDS, row)) for row in rows):
+                    output.write(line)
+                output.flush()
+            Buzz.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        archived += len(rows)
+        if len(rows) < batch_size:
+            return archived
+
+
+def run_retention_if_due():
+    """
+    Archive old read buzzes at most once per BUZZ_RETENTION_INTERVAL seconds; the cache lock
+    keeps processes sharing a cache from running it at the same time. Returns how many
+    were archived.
+    """
+    interval = settings.BUZZ_RETENTION_INTERVAL
+    if not interval or not cache.add(RETENTION_LOCK_KEY, True, interval):
+        return 0
+    return archive_read_buzzes()
+
+
+'''
+Old read buzzes are taken in created_at order through the partial (created_at) index on
+read rows, so each batch is an index range scan rather than a scan of the whole table. The
+same oldest-first order lines up with dropping whole time ranges, should the table ever be
+partitioned by created_at.
+'''
@@ -0,0 +1,24 @@
+from rest_framework import serializers
+from .models import Buzz, parse_read_position
+
+
+class BuzzSerializer(serializers.ModelSerializer):
+    trigger = serializers.ReadOnlyField(source='trigger.username')
+
+    class Meta:
+        model = Buzz
+        fields = ['id', 'trigger', 'post', 'comment', 'comment_count', 'is_read', 'created_at']
+        read_only_fields = fields
+
+
+class MarkReadSerializer(serializers.Serializer):
+    up_to = serializers.CharField(
+        required=False,
+        help_text="Only mark buzzes up to the newest one seen, given as '<created_at>,<id>' from the buzz list.",
+    )
+
+    def validate_up_to(self, value):
+        try:
+            return parse_read_position(value)
+        except ValueError as error:
+            raise serializers.ValidationError(str(error))
@@ -1,27 +1,67 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from blogs.signals import posts_imported
 from comments.models import Comment
-from .models import Buzz
+from .models import Buzz, UnreadBuzzCount
+from .outbox import create_buzzes, dispatcher, enqueue
 
 @receiver(post_save, sender=Comment)
 def create_buzz_on_comment(sender, instance, created, **kwargs):
     """
-    Signal to create a Buzz when a new comment is added to a user's post.
+    Queue a Buzz for a new comment on someone else's post. The comment request only writes
+    an outbox row; buzz.outbox creates the buzzes later, in batches.
     """
-    if created and instance.post.author != instance.author:
-        # Ensure the buzz is only created if the comment author is different from the post author
-        Buzz.objects.create(
-            user=instance.post.author,         # The user who will receive the buzz
-            trigger=instance.author,           # The user who triggered the buzz
-            post=instance.post,
-            comment=instance,
-            is_read=False
-        )
+    if created:
+        enqueue(instance)
+
+
+@receiver(post_save, sender=Buzz)
+def increment_unread_buzz_count(sender, instance, created, **kwargs):
+    """
+    Count every new unread buzz against its recipient's UnreadBuzzCount.
+    """
+    if created and not instance.is_read:
+        UnreadBuzzCount.adjust(instance.user_id, 1)
+
+
+@receiver(post_delete, sender=Buzz)
+def decrement_unread_buzz_count(sender, instance, **kwargs):
+    if not instance.is_read:
+        UnreadBuzzCount.adjust(instance.user_id, -1)
+
+@receiver(posts_imported)
+def create_buzzes_on_import(sender, posts, comments, **kwargs):
+    """
+    The bulk counterpart of create_buzz_on_comment: the buzzes of every imported comment
+    are written in one pass, without going through the outbox.
+    """
+    authors = {post.pk: post.author_id for post in posts}
+    create_buzzes(
+        (comment.pk, comment.author_id, comment.post_id, authors[comment.post_id], comment.created_at)
+        for comment in comments
+    )
+
+
+@receiver(request_started)
+def start_buzz_dispatcher(sender, **kwargs):
+    """
+    Start the outbox worker with the first request a process serves, so rows queued before
+    a restart are delivered, and the retention job runs, without waiting for the next
+    comment. Management commands never start it.
+    """
+    if settings.BUZZ_ASYNC_DELIVERY or settings.BUZZ_RETENTION_INTERVAL:
+        dispatcher.start()
 
 '''
 @receiver(post_save, sender=Comment): This decorator connects the create_buzz_on_comment function 
 to the post_save signal of the Comment model.
 
-The signal function checks if a new comment is created (created=True) and if the comment author 
-is not the post author. If both conditions are met, a Buzz is created.
-'''
\ No newline at end of file
+The signal function queues every new comment (created=True) in the buzz outbox; whether the
+comment author differs from the post author is checked when the queue is delivered, so the
+comment request doesn't have to load the post.
+
+increment_unread_buzz_count / decrement_unread_buzz_count keep UnreadBuzzCount in step with
+the Buzz table. Marking a buzz as read goes through Buzz.mark_as_read, which decrements it.
+'''
@@ -1,7 +1,24 @@
-from django.test import TestCase
+import asyncio
+import json
+import re
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
-from buzz.models import Buzz
+from buzz.admin import BuzzAdmin
+from buzz.context_processors import unread_buzz_count
+from buzz.models import ArchivedBuzz, Buzz, BuzzOutbox, UnreadBuzzCount, parse_read_position
+from buzz.live import RESYNC, Subscriber, broker, buzz_events
+from buzz.outbox import BuzzDispatcher, deliver_pending, dispatcher
+from buzz.retention import archive_read_buzzes, run_retention_if_due
 from blogs.models import BlogPost
 from comments.models import Comment
 from django.core.exceptions import PermissionDenied
@@ -186,4 +203,489 @@ class MarkBuzzAsReadViewTest(TestCase):
 
         # Ensure the buzz remains marked as read
         self.buzz.refresh_from_db()
-        self.assertTrue(self.buzz.is_read)
\ No newline at end of file
+        self.assertTrue(self.buzz.is_read)
+
+
+
+
+
+
+
+class UnreadBuzzCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user1 = User.objects.create_user(username='user1', password='password123')
+        self.user2 = User.objects.create_user(username='user2', password='password123')
+        self.post = BlogPost.objects.create(title="Test Post", content="Test content", author=self.user1)
+        for i in range(3):
+            Comment.objects.create(post=self.post, author=self.user2, content=f"Test Comment {i+1}")
+
+    def test_new_buzzes_increment_count(self):
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user1.pk), 3)
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user2.pk), 0)
+
+    def test_mark_as_read_decrements_once(self):
+        buzz = Buzz.objects.filter(user=self.user1).first()
+        buzz.mark_as_read()
+        buzz.mark_as_read()
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user1.pk), 2)
+
+    def test_deleting_unread_buzz_decrements_count(self):
+        Buzz.objects.filter(user=self.user1).first().delete()
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user1.pk), 2)
+
+    def test_recount_repairs_drift(self):
+        Buzz.objects.filter(user=self.user1).update(is_read=True)
+        UnreadBuzzCount.objects.create(user=self.user2, unread_count=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            UnreadBuzzCount.recount()
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user1.pk), 0)
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user2.pk), 0)
+
+        Buzz.objects.filter(user=self.user1).update(is_read=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            UnreadBuzzCount.recount([self.user1.pk])
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user1.pk), 3)
+
+    def test_context_processor_reads_counter(self):
+        self.client.login(username='user1', password='password123')
+        response = self.client.get(reverse('buzz:buzz_list'))
+        self.assertEqual(response.context['unread_buzz_count'], 3)
+
+
+
+
+
+
+
+
+class UnreadBuzzCountCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user1 = User.objects.create_user(username='user1', password='password123')
+        self.user2 = User.objects.create_user(username='user2', password='password123')
+        self.post = BlogPost.objects.create(title="Test Post", content="Test content", author=self.user1)
+        Comment.objects.create(post=self.post, author=self.user2, content="Test Comment")
+
+    def test_cached_count_needs_no_queries(self):
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user1.pk), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(UnreadBuzzCount.get_for_user(self.user1.pk), 1)
+
+    def test_new_comment_invalidates_cache(self):
+        UnreadBuzzCount.get_for_user(self.user1.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=self.user2, content="Another Comment")
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user1.pk), 2)
+
+    def test_cache_is_dropped_only_on_commit(self):
+        UnreadBuzzCount.get_for_user(self.user1.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Comment.objects.create(post=self.post, author=self.user2, content="Another Comment")
+            # Until the delivery commits, readers keep getting the committed count
+            self.assertEqual(UnreadBuzzCount.get_for_user(self.user1.pk), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user1.pk), 2)
+
+    def test_mark_as_read_invalidates_cache(self):
+        UnreadBuzzCount.get_for_user(self.user1.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Buzz.objects.get(user=self.user1).mark_as_read()
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user1.pk), 0)
+
+    def test_admin_action_invalidates_cache(self):
+        UnreadBuzzCount.get_for_user(self.user1.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            BuzzAdmin(Buzz, admin.site).mark_as_read(None, Buzz.objects.all())
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.user1.pk), 0)
+
+    def test_count_is_not_loaded_unless_rendered(self):
+        request = RequestFactory().get('/')
+        request.user = self.user1
+        with self.assertNumQueries(0):
+            context = unread_buzz_count(request)
+            self.assertIs(unread_buzz_count(request)['unread_buzz_count'], context['unread_buzz_count'])
+        self.assertEqual(context['unread_buzz_count'], 1)
+
+    def badge_classes(self, user):
+        self.client.force_login(user)
+        response = self.client.get(reverse('buzz:buzz_list'))
+        return re.search(r'<span id="unread-buzz-count" class="([^"]*)"', response.content.decode()).group(1).split()
+
+    def test_badge_is_hidden_only_without_unread_buzzes(self):
+        self.assertNotIn('hidden', self.badge_classes(self.user1))
+        self.assertIn('hidden', self.badge_classes(self.user2))
+
+
+
+
+
+
+
+
+
+
+
+@override_settings(BUZZ_ASYNC_DELIVERY=True)
+class BuzzOutboxTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='password123')
+        self.commenter = User.objects.create_user(username='commenter', password='password123')
+        self.post = BlogPost.objects.create(title="Busy Post", content="Content", author=self.author)
+
+    def test_comment_only_queues_the_buzz(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            comment = Comment.objects.create(post=self.post, author=self.commenter, content="Queued")
+        self.assertIn(dispatcher.wake, callbacks)  # Wakes the dispatcher once committed
+        self.assertFalse(Buzz.objects.exists())
+        self.assertEqual(list(BuzzOutbox.objects.values_list('comment_id', flat=True)), [comment.pk])
+
+    def test_comment_storm_is_delivered_in_one_batch(self):
+        for i in range(20):
+            Comment.objects.create(post=self.post, author=self.commenter, content=f"Comment {i}")
+        Comment.objects.create(post=self.post, author=self.author, content="Own comment")
+        UnreadBuzzCount.objects.create(user=self.author)
+
+        # Read the queue and the comments, insert the buzzes, update one counter, clear the queue
+        with self.assertNumQueries(7):
+            self.assertEqual(deliver_pending(), 21)
+        self.assertEqual(Buzz.objects.filter(user=self.author, trigger=self.commenter).count(), 20)
+        self.assertFalse(Buzz.objects.filter(trigger=self.author).exists())
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.author.pk), 20)
+        self.assertFalse(BuzzOutbox.objects.exists())
+        self.assertEqual(deliver_pending(), 0)
+
+    def test_batch_size_limits_one_pass(self):
+        for i in range(5):
+            Comment.objects.create(post=self.post, author=self.commenter, content=f"Comment {i}")
+        self.assertEqual(deliver_pending(batch_size=3), 3)
+        self.assertEqual(BuzzOutbox.objects.count(), 2)
+
+    def test_deleted_comment_leaves_the_queue(self):
+        comment = Comment.objects.create(post=self.post, author=self.commenter, content="Gone")
+        comment.delete()
+        self.assertFalse(BuzzOutbox.objects.exists())
+
+    def test_first_request_starts_the_dispatcher(self):
+        with mock.patch.object(dispatcher, 'start') as start:
+            self.client.get(reverse('buzz:buzz_list'))
+            with override_settings(BUZZ_ASYNC_DELIVERY=False):
+                self.client.get(reverse('buzz:buzz_list'))
+        self.assertEqual(start.call_count, 1)
+
+    @override_settings(BUZZ_ASYNC_DELIVERY=False, BUZZ_RETENTION_INTERVAL=3600)
+    def test_retention_starts_the_dispatcher_without_async_delivery(self):
+        with mock.patch.object(dispatcher, 'start') as start:
+            self.client.get(reverse('buzz:buzz_list'))
+        start.assert_called_once_with()
+
+    def test_dispatcher_drains_the_queue_when_started(self):
+        worker = BuzzDispatcher()
+        # Stop the loop where it would go to sleep waiting for a wake-up
+        with mock.patch('buzz.outbox.time.sleep'), mock.patch('buzz.outbox.deliver_all', return_value=0) as deliver, \
+                mock.patch.object(worker.event, 'wait', side_effect=SystemExit):
+            with self.assertRaises(SystemExit):
+                worker.run()
+        deliver.assert_called_once_with()
+
+
+
+
+
+
+
+
+
+
+
+@override_settings(BUZZ_COALESCE_WINDOW=3600)
+class BuzzDigestTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='password123')
+        self.first = User.objects.create_user(username='first', password='password123')
+        self.second = User.objects.create_user(username='second', password='password123')
+        self.post = BlogPost.objects.create(title="Hot Post", content="Content", author=self.author)
+
+    def comment(self, author, post=None):
+        return Comment.objects.create(post=post or self.post, author=author, content="Comment")
+
+    def test_comments_in_one_window_fold_into_one_buzz(self):
+        for i in range(10):
+            self.comment(self.first)
+        latest = self.comment(self.second)
+
+        buzz = Buzz.objects.get()
+        self.assertEqual(buzz.user, self.author)
+        self.assertEqual(buzz.comment_count, 11)
+        self.assertEqual((buzz.trigger, buzz.comment), (self.second, latest))
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.author.pk), 1)
+
+        self.client.login(username='author', password='password123')
+        response = self.client.get(reverse('buzz:buzz_list'))
+        self.assertContains(response, 'and others left 11 comments')
+
+    def test_new_activity_revives_a_read_digest(self):
+        self.comment(self.first)
+        buzz = Buzz.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            buzz.mark_as_read()
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.author.pk), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comment(self.second)
+        buzz.refresh_from_db()
+        self.assertFalse(buzz.is_read)
+        self.assertEqual(buzz.comment_count, 2)
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.author.pk), 1)
+
+    def test_deleting_the_latest_comment_keeps_the_digest(self):
+        self.comment(self.first)
+        self.comment(self.second)
+        latest = self.comment(self.second)
+        latest.delete()
+
+        buzz = Buzz.objects.get()
+        self.assertIsNone(buzz.comment)
+        self.assertEqual(buzz.comment_count, 2)
+        self.assertEqual(UnreadBuzzCount.count_for_user(self.author.pk), 1)
+        self.client.login(username='author', password='password123')
+        self.assertContains(self.client.get(reverse('buzz:buzz_detail', kwargs={'pk': buzz.pk})), '2 comments')
+
+        self.post.delete()
+        self.assertFalse(Buzz.objects.exists())
+
+    def test_deleting_a_single_comment_deletes_its_buzz(self):
+        with self.settings(BUZZ_COALESCE_WINDOW=0):
+            comment = self.comment(self.first)
+        comment.delete()
+        self.assertFalse(Buzz.objects.exists())
+        self.assertEqual(UnreadBuzzCount.count_for_user(self.author.pk), 0)
+
+    def test_mark_all_leaves_a_digest_revived_after_render_unread(self):
+        self.comment(self.first)
+        Buzz.objects.get().mark_as_read()
+        self.comment(self.first, post=BlogPost.objects.create(title="Quiet Post", content="Content", author=self.author))
+        self.client.login(username='author', password='password123')
+        up_to = self.client.get(reverse('buzz:buzz_list')).context['read_up_to']
+
+        # New activity on the read digest after the page was rendered: same id, newer created_at
+        self.comment(self.second)
+        self.client.post(reverse('buzz:mark_all_buzzes_as_read'), {'up_to': up_to})
+        self.assertEqual(list(Buzz.objects.filter(is_read=False).values_list('post_id', flat=True)), [self.post.pk])
+
+    def test_posts_get_separate_digests(self):
+        other = BlogPost.objects.create(title="Other Post", content="Content", author=self.author)
+        self.comment(self.first)
+        self.comment(self.first, post=other)
+        self.comment(self.second, post=other)
+        self.assertEqual(
+            dict(Buzz.objects.values_list('post_id', 'comment_count')), {self.post.pk: 1, other.pk: 2},
+        )
+
+    @override_settings(BUZZ_ASYNC_DELIVERY=True)
+    def test_a_queued_storm_is_one_upsert(self):
+        for i in range(30):
+            self.comment(self.first if i % 2 else self.second)
+        deliver_pending()
+        self.assertEqual(Buzz.objects.get().comment_count, 30)
+
+
+
+
+
+
+
+
+
+
+
+class MarkBuzzesReadInBulkTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='password123')
+        self.commenter = User.objects.create_user(username='commenter', password='password123')
+        post = BlogPost.objects.create(title="Post", content="Content", author=self.author)
+        for i in range(5):
+            Comment.objects.create(post=post, author=self.commenter, content=f"Comment {i}")
+        self.buzz_ids = sorted(Buzz.objects.values_list('pk', flat=True))
+        self.other = Buzz.objects.create(user=self.commenter, trigger=self.author, post=post, comment=Comment.objects.first())
+
+    def unread(self):
+        return sorted(Buzz.objects.filter(user=self.author, is_read=False).values_list('pk', flat=True))
+
+    def position(self, index):
+        return Buzz.objects.get(pk=self.buzz_ids[index]).read_position
+
+    def test_mark_read_up_to_is_one_update(self):
+        # The UPDATE itself and the unread counter's
+        up_to = parse_read_position(self.position(2))
+        with self.assertNumQueries(2):
+            self.assertEqual(Buzz.mark_read(self.author.pk, up_to=up_to), 3)
+        self.assertEqual(self.unread(), self.buzz_ids[3:])
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.author.pk), 2)
+
+    def test_mark_all_view_stops_at_up_to(self):
+        self.client.login(username='author', password='password123')
+        response = self.client.get(reverse('buzz:buzz_list'))
+        self.assertEqual(response.context['read_up_to'], self.position(-1))
+
+        response = self.client.post(reverse('buzz:mark_all_buzzes_as_read'), {'up_to': self.position(1)})
+        self.assertRedirects(response, reverse('buzz:buzz_list'))
+        self.assertEqual(self.unread(), self.buzz_ids[2:])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('buzz:mark_all_buzzes_as_read'))
+        self.assertEqual(self.unread(), [])
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.author.pk), 0)
+        self.assertFalse(Buzz.objects.get(pk=self.other.pk).is_read)  # Another user's buzz
+
+    def test_mark_all_view_rejects_a_bad_up_to(self):
+        self.client.login(username='author', password='password123')
+        response = self.client.post(reverse('buzz:mark_all_buzzes_as_read'), {'up_to': 'all'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.unread()), 5)
+
+    def test_owner_marks_one_buzz_read(self):
+        self.client.login(username='author', password='password123')
+        self.client.post(reverse('buzz:mark_buzz_as_read', kwargs={'pk': self.buzz_ids[0]}))
+        self.assertEqual(self.unread(), self.buzz_ids[1:])
+
+    def test_api_lists_and_marks_buzzes(self):
+        self.client.login(username='author', password='password123')
+        response = self.client.get('/api/buzz/buzzes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+
+        response = self.client.post(f'/api/buzz/buzzes/{self.buzz_ids[0]}/read/')
+        self.assertEqual(response.json(), {'marked': 1, 'unread_count': 4})
+        response = self.client.post(f'/api/buzz/buzzes/{self.other.pk}/read/')
+        self.assertEqual(response.json(), {'marked': 0, 'unread_count': 4})
+
+        response = self.client.post('/api/buzz/buzzes/read/', {'up_to': self.position(3)}, content_type='application/json')
+        self.assertEqual(response.json(), {'marked': 3, 'unread_count': 1})
+        response = self.client.post('/api/buzz/buzzes/read/', {}, content_type='application/json')
+        self.assertEqual(response.json(), {'marked': 1, 'unread_count': 0})
+
+
+
+
+
+
+
+
+
+
+
+class BuzzRetentionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='password123')
+        self.commenter = User.objects.create_user(username='commenter', password='password123')
+        post = BlogPost.objects.create(title="Post", content="Content", author=self.author)
+        for i in range(6):
+            Comment.objects.create(post=post, author=self.commenter, content=f"Comment {i}")
+        ids = sorted(Buzz.objects.values_list('pk', flat=True))
+        Buzz.objects.filter(pk__in=ids[:4]).update(created_at=timezone.now() - timedelta(days=200))
+        Buzz.objects.filter(pk__in=ids[:3] + ids[5:]).update(is_read=True)
+        UnreadBuzzCount.recount()
+        # Old and read: archived. Old but unread, and recent: kept.
+        self.old_read, self.kept = ids[:3], ids[3:]
+
+    def test_archives_old_read_buzzes_in_batches(self):
+        self.assertEqual(archive_read_buzzes(timedelta(days=90), batch_size=2), 3)
+        self.assertEqual(sorted(Buzz.objects.values_list('pk', flat=True)), self.kept)
+        archived = ArchivedBuzz.objects.order_by('pk')
+        self.assertEqual([buzz.pk for buzz in archived], self.old_read)
+        self.assertEqual(archived[0].user, self.author)
+        self.assertEqual(UnreadBuzzCount.get_for_user(self.author.pk), 2)
+        self.assertEqual(archive_read_buzzes(timedelta(days=90)), 0)
+
+    def test_archives_to_ndjson(self):
+        output = BytesIO()
+        self.assertEqual(archive_read_buzzes(timedelta(days=90), output=output), 3)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([record['id'] for record in records], self.old_read)
+        self.assertEqual(records[0]['user'], self.author.pk)
+        self.assertFalse(ArchivedBuzz.objects.exists())
+        self.assertEqual(sorted(Buzz.objects.values_list('pk', flat=True)), self.kept)
+
+    def test_scheduled_retention_runs_once_per_interval(self):
+        with override_settings(BUZZ_RETENTION_INTERVAL=0):
+            self.assertEqual(run_retention_if_due(), 0)
+        with override_settings(BUZZ_RETENTION_INTERVAL=3600, BUZZ_RETENTION_DAYS=90):
+            self.assertEqual(run_retention_if_due(), 3)
+            Buzz.objects.filter(pk__in=self.kept).update(is_read=True)
+            self.assertEqual(run_retention_if_due(), 0)  # Not due again yet
+
+
+
+
+
+
+
+
+
+
+
+class BuzzStreamTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='password123')
+        self.commenter = User.objects.create_user(username='commenter', password='password123')
+        self.post = BlogPost.objects.create(title="Post", content="Content", author=self.author)
+
+    def comment(self):
+        # Buzzes are published once the comment's transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            return Comment.objects.create(post=self.post, author=self.commenter, content="Live")
+
+    async def test_stream_pushes_new_buzzes(self):
+        await self.async_client.aforce_login(self.author)
+        response = await self.async_client.get(reverse('buzz:buzz_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        stream = aiter(response.streaming_content)
+        self.assertIn(b'event: unread\ndata: {"unread_count": 0}', await anext(stream))
+
+        comment = await sync_to_async(self.comment)()
+        chunk = await asyncio.wait_for(anext(stream), 1)
+        self.assertIn(b'event: buzz\n', chunk)
+        self.assertIn(f'"comment": {comment.pk}'.encode(), chunk)
+        self.assertIn(b'event: unread\ndata: {"unread_count": 1}', chunk)
+
+    async def test_stream_sends_heartbeats_and_unsubscribes(self):
+        events = buzz_events(self.author.pk)
+        await anext(events)
+        self.assertIn(self.author.pk, broker.subscribers)
+        with mock.patch('buzz.live.STREAM_HEARTBEAT_INTERVAL', 0.01):
+            self.assertEqual(await anext(events), ': heartbeat\n\n')
+        await events.aclose()
+        self.assertNotIn(self.author.pk, broker.subscribers)
+
+    def test_slow_client_gets_a_resync(self):
+        subscriber = Subscriber(self.author.pk, loop=None, maxsize=3)
+        for i in range(5):
+            subscriber.offer({'id': i})
+        # The backlog is replaced by one resync; later events queue up behind it
+        self.assertIs(subscriber.queue.get_nowait(), RESYNC)
+        self.assertEqual(subscriber.queue.get_nowait(), {'id': 4})
+        self.assertTrue(subscriber.queue.empty())
+
+    async def test_stream_requires_login(self):
+        response = await self.async_client.get(reverse('buzz:buzz_stream'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_stream_is_refused_under_wsgi(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('buzz:buzz_stream'))
+        self.assertEqual(response.status_code, 204)
+        self.assertNotIn(reverse('buzz:buzz_stream'), self.client.get(reverse('buzz:buzz_list')).content.decode())
+
+    async def test_pages_open_the_stream_under_asgi(self):
+        await self.async_client.aforce_login(self.author)
+        response = await self.async_client.get(reverse('buzz:buzz_list'))
+        self.assertIn(f'new EventSource("{reverse("buzz:buzz_stream")}")', response.content.decode())
+
@@ -1,10 +1,23 @@
-from django.urls import path
-from .views import BuzzListView, MarkBuzzAsReadView, BuzzDetailView
+from django.urls import path, include
+from .views import BuzzListView, BuzzStreamView, MarkBuzzAsReadView, MarkAllBuzzesAsReadView, BuzzDetailView
 
 app_name = 'buzz'
 
 urlpatterns = [
     path('all/', BuzzListView.as_view(), name='buzz_list'),
     path('mark_as_read/<int:pk>/', MarkBuzzAsReadView.as_view(), name='mark_buzz_as_read'),
+    path('mark_all_as_read/', MarkAllBuzzesAsReadView.as_view(), name='mark_all_buzzes_as_read'),
     path('<int:pk>/', BuzzDetailView.as_view(), name='buzz_detail'),
+    path('stream/', BuzzStreamView.as_view(), name='buzz_stream'),
+]
+
+
+from rest_framework.routers import DefaultRouter
+from .views import BuzzViewSet
+
+router = DefaultRouter()
+router.register(r'buzzes', BuzzViewSet, basename='buzz')
+
+urlpatterns += [
+    path('', include(router.urls)),
 ]
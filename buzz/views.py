@@ -1,11 +1,12 @@
-from django.views.generic import ListView, UpdateView, DetailView
-from .models import Buzz
+from django.views.generic import ListView, DetailView
+from .live import buzz_events
+from .models import Buzz, parse_read_position
 from django.shortcuts import get_object_or_404, redirect
-from django.http import HttpResponseForbidden
-from django.urls import reverse_lazy
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
 from django.views import View
+from core.streaming import is_asgi_request
 
 
 class BuzzListView(LoginRequiredMixin, ListView):
@@ -18,7 +19,14 @@ class BuzzListView(LoginRequiredMixin, ListView):
         """
         Filter buzz notifications to only include those for the logged-in user.
         """
-        return Buzz.objects.filter(user=self.request.user).order_by('-created_at')
+        return Buzz.objects.filter(user=self.request.user).select_related('trigger', 'post', 'comment').order_by('-created_at')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # "Mark all as read" stops at the newest buzz shown, leaving later arrivals and revived digests unread
+        latest = max(context['buzzes'], key=lambda buzz: (buzz.created_at, buzz.pk), default=None)
+        context['read_up_to'] = latest.read_position if latest else None
+        return context
 
 
 
@@ -40,10 +48,10 @@ class BuzzDetailView(LoginRequiredMixin, DetailView):
         Retrieve the Buzz instance and ensure it's for the current user.
         """
         # Get the Buzz instance based on the primary key (pk) from URL
-        buzz = get_object_or_404(Buzz, pk=self.kwargs['pk'])
+        buzz = get_object_or_404(Buzz.objects.select_related('trigger', 'post', 'comment'), pk=self.kwargs['pk'])
 
         # Check if the current user is the owner of the buzz notification
-        if buzz.user != self.request.user:
+        if buzz.user_id != self.request.user.pk:
             raise PermissionDenied("You do not have permission to view this buzz.")
 
         # Mark the buzz as read once accessed
@@ -64,33 +72,110 @@ class BuzzDetailView(LoginRequiredMixin, DetailView):
 
 
 
-class MarkBuzzAsReadView(LoginRequiredMixin, UserPassesTestMixin, View):
-    model = Buzz
-    fields = []  # No form fields to display or update
+class BuzzStreamView(View):
+    """
+    Live buzzes for the logged-in user as server-sent events (see buzz.live). Async, so
+    under ASGI an open stream costs a coroutine rather than a worker thread.
+
+    Under WSGI (runserver) the endless stream would be drained into a list on a worker
+    thread that never returns, so it is refused with a 204, which also tells EventSource
+    not to reconnect.
+    """
+
+    async def get(self, request):
+        if not is_asgi_request(request):
+            return HttpResponse(status=204)
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponseForbidden()
+        response = StreamingHttpResponse(buzz_events(user.pk), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Keep nginx-style proxies from buffering the stream
+        return response
+
+
 
-    def get_object(self, queryset=None):
-        """Retrieve the Buzz instance or return 404."""
-        buzz = get_object_or_404(Buzz, pk=self.kwargs['pk'])
-        return buzz
 
-    def test_func(self):
-        """Ensure that only the owner of the buzz can mark it as read."""
-        buzz = self.get_object()
-        return self.request.user == buzz.user
 
-    def form_valid(self, form):
-        """Mark the buzz as read and redirect to the list view."""
-        form.instance.is_read = True
-        return super().form_valid(form)
 
-    def get_success_url(self):
-        """Redirect to the list of buzz notifications after marking as read."""
-        return reverse_lazy('buzz:buzz_list')
+class MarkBuzzAsReadView(LoginRequiredMixin, View):
+    """
+    Mark one of the user's buzzes as read. Ownership is part of the UPDATE's WHERE clause,
+    so nothing is loaded first and other users' buzzes are simply left alone.
+    """
 
-    def handle_no_permission(self):
-        """Handle the case where the user does not have permission."""
+    def post(self, request, pk):
+        Buzz.mark_read(request.user.pk, pk=pk)
         return self.redirect_to_list()
 
     def redirect_to_list(self):
-        """Redirect to the list of buzz notifications if no permission."""
+        """Redirect to the list of buzz notifications."""
         return redirect('buzz:buzz_list')
+
+
+
+
+
+
+class MarkAllBuzzesAsReadView(MarkBuzzAsReadView):
+    """
+    Mark all of the user's buzzes as read in one UPDATE, or with `up_to` (the read position
+    of the newest buzz on the page) only those at or before it, so buzzes that arrived or
+    were revived after the page was rendered stay unread.
+    """
+
+    def post(self, request):
+        up_to = request.POST.get('up_to') or None
+        if up_to is not None:
+            try:
+                up_to = parse_read_position(up_to)
+            except ValueError:
+                return HttpResponseBadRequest("up_to must be a buzz position.")
+        Buzz.mark_read(request.user.pk, up_to=up_to)
+        return self.redirect_to_list()
+
+
+
+
+from rest_framework import status, viewsets
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .models import UnreadBuzzCount
+from .serializers import BuzzSerializer, MarkReadSerializer
+
+
+
+
+
+
+class BuzzViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    The logged-in user's buzzes, newest first, with single-statement mark-read actions.
+    """
+    serializer_class = BuzzSerializer
+    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Buzz.objects.filter(user=self.request.user).select_related('trigger').order_by('-created_at', '-id')
+
+    def marked(self, count):
+        # From the database: the cached count is only dropped once this write commits
+        return Response({'marked': count, 'unread_count': UnreadBuzzCount.count_for_user(self.request.user.pk)})
+
+    @action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        if not pk.isdigit():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return self.marked(Buzz.mark_read(request.user.pk, pk=int(pk)))
+
+    @action(detail=False, methods=['post'], url_path='read', serializer_class=MarkReadSerializer)
+    def read_all(self, request):
+        """Mark all buzzes read, or with `up_to` those at or before that position."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self.marked(Buzz.mark_read(request.user.pk, up_to=serializer.validated_data.get('up_to')))
+
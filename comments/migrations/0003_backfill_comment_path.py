@@ -0,0 +1,41 @@
+# Generated by Django 5.1 on 2026-10-18 17:24
+
+from django.db import migrations
+
+
+PATH_STEP = 10
+BATCH_SIZE = 1000
+
+
+def backfill_paths(apps, schema_editor):
+    """
+    Fill in Comment.path level by level, starting from top-level comments, so every
+    parent's path is known before its replies are written.
+    """
+    Comment = apps.get_model('comments', 'Comment')
+    level = Comment.objects.filter(path='', parent__isnull=True)
+
+    while True:
+        rows = list(level.values_list('id', 'parent__path'))
+        if not rows:
+            break
+
+        comments = [
+            Comment(id=pk, path=(parent_path or '') + str(pk).zfill(PATH_STEP))
+            for pk, parent_path in rows
+        ]
+        Comment.objects.bulk_update(comments, ['path'], batch_size=BATCH_SIZE)
+
+        # Replies whose parent has just been given a path
+        level = Comment.objects.filter(path='', parent__isnull=False).exclude(parent__path='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0002_comment_path'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
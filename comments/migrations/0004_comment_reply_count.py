@@ -0,0 +1,37 @@
+# Generated by Django 5.1 on 2026-10-18 17:22
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """
+    Populate BlogPost.comment_count and Comment.reply_count from the existing rows.
+    """
+    BlogPost = apps.get_model('blogs', 'BlogPost')
+    Comment = apps.get_model('comments', 'Comment')
+
+    def count_of(field):
+        counts = Comment.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk'))
+        return Coalesce(Subquery(counts.values('total')), 0)
+
+    BlogPost.objects.update(comment_count=count_of('post'))
+    Comment.objects.update(reply_count=count_of('parent'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0003_blogpost_comment_count'),
+        ('comments', '0003_backfill_comment_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,19 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
 from django.conf import settings
 from blogs.models import BlogPost  # Import the BlogPost model
 
 
+# Each level of a comment's materialized path is its pk, zero-padded to a fixed width,
+# so sorting by path gives depth-first thread order and a subtree is one prefix range.
+PATH_STEP = 10
+PATH_MAX_LENGTH = 1000
+
+# Deepest reply level whose path still fits in PATH_MAX_LENGTH (top-level comments are depth 0)
+MAX_DEPTH = PATH_MAX_LENGTH // PATH_STEP - 1
+
+
 
 class Comment(models.Model):
     post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='comments')
@@ -11,6 +22,10 @@ class Comment(models.Model):
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='replies')
     #parent: Self-referential ForeignKey to allow comments to have replies. 
     #If parent is None, it’s a top-level comment; otherwise, it’s a reply.
+    path = models.CharField(max_length=PATH_MAX_LENGTH, blank=True, default='', editable=False)
+    #path: Materialized path of ancestor pks (root first), maintained in save().
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+    #reply_count: Number of direct replies, maintained by comments.signals.
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -18,6 +33,63 @@ class Comment(models.Model):
         ordering = ['-created_at']  # Newest comments first
         verbose_name = 'Comment'
         verbose_name_plural = 'Comments'
+        indexes = [
+            models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+            # Pattern ops let PostgreSQL answer `path LIKE 'prefix%'` from the index
+            models.Index(fields=['path'], name='comment_path_prefix_idx', opclasses=['varchar_pattern_ops']),
+            # Backs keyset (cursor) pagination of the comments API
+            models.Index(fields=['-created_at', '-id'], name='comment_created_id_idx'),
+            # A post's comments (the detail page's thread) and the replies under one parent, newest first
+            models.Index(fields=['post', 'parent', '-created_at'], name='comment_post_parent_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_parent_id = instance.__dict__.get('parent_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        # One transaction, so a failed path write never leaves a comment without its path
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+            if adding:
+                self.path = self.build_path()
+                Comment.objects.filter(pk=self.pk).update(path=self.path)
+            elif self.parent_id != getattr(self, '_loaded_parent_id', self.parent_id):
+                self.move_subtree()
+        self._loaded_parent_id = self.parent_id
+
+    def build_path(self):
+        segment = str(self.pk).zfill(PATH_STEP)
+        if self.parent_id is None:
+            return segment
+        return self.parent.path + segment
+
+    def move_subtree(self):
+        """
+        Rewrite the path of this comment and all of its descendants after a re-parent.
+        """
+        old_path = self.path
+        self.path = self.build_path()
+        Comment.objects.filter(path__startswith=old_path).update(
+            path=Concat(Value(self.path), Substr('path', len(old_path) + 1))
+        )
+
+    @property
+    def depth(self):
+        return len(self.path) // PATH_STEP - 1
+
+    def get_thread(self):
+        """
+        This comment and every reply below it, in depth-first display order.
+        """
+        return Comment.objects.filter(post_id=self.post_id, path__startswith=self.path).order_by('path')
+
+    def get_descendants(self):
+        return self.get_thread().exclude(pk=self.pk)
 
     def __str__(self):
         if self.parent:
@@ -26,5 +98,5 @@ class Comment(models.Model):
 
     @property
     def is_reply(self):
-        return self.parent is not None
+        return self.parent_id is not None
         #is_reply(): Helper method to check if the comment is a reply to another comment.
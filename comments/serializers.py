@@ -9,8 +9,30 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
-        fields = ['id', 'post', 'author', 'content', 'parent', 'is_reply', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at', 'author', 'post']
+        fields = ['id', 'post', 'author', 'content', 'parent', 'is_reply', 'reply_count', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'author', 'post', 'reply_count']
+
+    def validate_content(self, value):
+        value = value.strip()
+        if not value:
+            raise serializers.ValidationError("Comment content cannot be empty.")
+        return value
+
+
+class CommentImportSerializer(serializers.Serializer):
+    """
+    One comment of a bulk import, with its replies nested below it. `author` is a username
+    (the importing user when left out); usernames are resolved for the whole payload at once
+    by BlogPostImportListSerializer, not per comment.
+    """
+    author = serializers.CharField(required=False, allow_null=True, default=None)
+    content = serializers.CharField()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Built lazily, one level at a time, only when a comment actually has replies
+        fields['replies'] = CommentImportSerializer(many=True, required=False, default=list)
+        return fields
 
     def validate_content(self, value):
         value = value.strip()
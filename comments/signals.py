@@ -0,0 +1,42 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from blogs.models import BlogPost
+from blogs.page_cache import bump_page_versions, list_scope, post_scope
+from .models import Comment
+
+@receiver(post_save, sender=Comment)
+def increment_comment_counters(sender, instance, created, **kwargs):
+    """
+    Keep BlogPost.comment_count and the parent's Comment.reply_count in step with new comments.
+    """
+    if not created:
+        return
+    BlogPost.objects.filter(pk=instance.post_id).update(comment_count=F('comment_count') + 1)
+    if instance.parent_id is not None:
+        Comment.objects.filter(pk=instance.parent_id).update(reply_count=F('reply_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_counters(sender, instance, **kwargs):
+    """
+    Undo the increments when a comment is deleted. Cascaded replies each fire
+    post_delete too, so a deleted thread is subtracted in full.
+    """
+    BlogPost.objects.filter(pk=instance.post_id, comment_count__gt=0).update(comment_count=F('comment_count') - 1)
+    if instance.parent_id is not None:
+        Comment.objects.filter(pk=instance.parent_id, reply_count__gt=0).update(reply_count=F('reply_count') - 1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_pages_on_comment_change(sender, instance, **kwargs):
+    # The post's detail page shows the comment; the post list shows the comment count
+    bump_page_versions([list_scope(), post_scope(instance.post_id)])
+
+'''
+The counters are updated with F() expressions, so the increment happens inside the
+UPDATE statement and concurrent comments cannot overwrite each other's counts.
+Drift (e.g. rows written with bulk_create or raw SQL, which skip signals) is repaired by the
+reconcile_counters management command.
+'''
@@ -1,8 +1,12 @@
+from io import StringIO
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APITestCase
 from django.urls import reverse
 from django.contrib.auth.models import User
 from blogs.models import BlogPost, Tag
-from comments.models import Comment
+from comments.models import Comment, MAX_DEPTH, PATH_STEP
+from comments.tree import build_comment_tree
 
 class CommentCreateViewTest(TestCase):
     @classmethod
@@ -327,4 +331,220 @@ class ReplyCreateViewTest(TestCase):
         reply = Comment.objects.get(parent=self.comment)
         self.assertEqual(reply.content, 'Reply by another user.')
         self.assertEqual(reply.author, self.other_user)
-        self.assertEqual(reply.parent, self.comment)
\ No newline at end of file
+        self.assertEqual(reply.parent, self.comment)
+
+    def test_reply_past_max_depth_is_rejected(self):
+        """A reply whose path would overflow Comment.path is refused instead of saved without one."""
+        Comment.objects.filter(pk=self.comment.pk).update(path='0' * (PATH_STEP * (MAX_DEPTH + 1)))
+        self.client.login(username='testuser', password='password123')
+        response = self.client.post(self.reply_url, {'content': 'Too deep.'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'at most {MAX_DEPTH} levels deep')
+        self.assertEqual(Comment.objects.count(), 1)
+
+
+
+
+
+
+
+
+class CommentTreeTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.other_user = User.objects.create_user(username='otheruser', password='password123')
+        self.post = BlogPost.objects.create(title='Test Post', content='Test content', author=self.user)
+
+    def create_thread(self, replies):
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(post=self.post, author=self.other_user, content='Top-level comment')
+            for i in range(replies):
+                reply = Comment.objects.create(post=self.post, author=self.user, content=f'Reply {i}', parent=comment)
+                Comment.objects.create(post=self.post, author=self.other_user, content=f'Nested reply {i}', parent=reply)
+        return comment
+
+    def test_tree_nests_replies_under_parents(self):
+        comment = self.create_thread(2)
+        roots = build_comment_tree(self.post)
+
+        self.assertEqual(roots, [comment])
+        self.assertEqual(len(roots[0].children), 2)
+        for reply in roots[0].children:
+            self.assertEqual(reply.parent, comment)
+            self.assertEqual(len(reply.children), 1)
+
+    def test_detail_view_query_count_is_constant(self):
+        # post joined with author, prefetched tags, comments joined with authors
+        self.create_thread(1)
+        with self.assertNumQueries(3):
+            self.client.get(reverse('blogs:post_detail', kwargs={'pk': self.post.pk}))
+
+        self.create_thread(5)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('blogs:post_detail', kwargs={'pk': self.post.pk}))
+        self.assertContains(response, 'Nested reply 4')
+
+
+
+
+
+
+
+
+
+class CommentPathTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.post = BlogPost.objects.create(title='Test Post', content='Test content', author=self.user)
+        self.comment = Comment.objects.create(post=self.post, author=self.user, content='Top-level comment')
+        self.reply = Comment.objects.create(post=self.post, author=self.user, content='Reply', parent=self.comment)
+        self.nested = Comment.objects.create(post=self.post, author=self.user, content='Nested', parent=self.reply)
+
+    def test_path_extends_parent_path(self):
+        self.assertTrue(self.reply.path.startswith(self.comment.path))
+        self.assertTrue(self.nested.path.startswith(self.reply.path))
+        self.assertEqual([self.comment.depth, self.reply.depth, self.nested.depth], [0, 1, 2])
+
+    def test_thread_is_one_query_in_display_order(self):
+        Comment.objects.create(post=self.post, author=self.user, content='Second reply', parent=self.comment)
+        with self.assertNumQueries(1):
+            thread = [c.content for c in self.comment.get_thread()]
+        self.assertEqual(thread, ['Top-level comment', 'Reply', 'Nested', 'Second reply'])
+
+    def test_reparent_moves_subtree(self):
+        other = Comment.objects.create(post=self.post, author=self.user, content='Other comment')
+        reply = Comment.objects.get(pk=self.reply.pk)
+        reply.parent = other
+        reply.save()
+
+        self.nested.refresh_from_db()
+        self.assertTrue(self.nested.path.startswith(other.path))
+        self.assertEqual(list(self.comment.get_descendants()), [])
+
+
+
+
+
+
+
+
+
+class CommentCounterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.post = BlogPost.objects.create(title='Test Post', content='Test content', author=self.user)
+        self.comment = Comment.objects.create(post=self.post, author=self.user, content='Top-level comment')
+        self.reply = Comment.objects.create(post=self.post, author=self.user, content='Reply', parent=self.comment)
+
+    def test_counters_follow_new_comments(self):
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(self.comment.reply_count, 1)
+
+    def test_counters_follow_deletes(self):
+        self.reply.delete()
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.comment.reply_count, 0)
+
+        # Deleting a thread subtracts its cascaded replies as well
+        Comment.objects.create(post=self.post, author=self.user, content='Reply', parent=self.comment)
+        self.comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_reconcile_counters_repairs_drift(self):
+        BlogPost.objects.update(comment_count=42)
+        Comment.objects.update(reply_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.reply.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(self.comment.reply_count, 1)
+        self.assertEqual(self.reply.reply_count, 0)
+
+
+
+
+
+
+
+
+
+class CommentCursorPaginationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.client.force_authenticate(self.user)
+        post = BlogPost.objects.create(title='Test Post', content='Test content', author=self.user)
+        for i in range(12):
+            Comment.objects.create(post=post, author=self.user, content=f'Comment {i}')
+
+    def test_cursor_pagination_walks_all_comments(self):
+        response = self.client.get('/api/comments/comments/', {'pagination': 'cursor'})
+        ids = [comment['id'] for comment in response.data['results']]
+        response = self.client.get(response.data['next'])
+        ids += [comment['id'] for comment in response.data['results']]
+        self.assertEqual(ids, list(Comment.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+
+
+
+
+
+class CommentConditionalGetTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.client.force_authenticate(self.user)
+        self.post = BlogPost.objects.create(title='Test Post', content='Test content', author=self.user)
+        self.comment = Comment.objects.create(post=self.post, author=self.user, content='Comment')
+
+    def test_thread_polling_gets_not_modified_until_a_reply(self):
+        url = f'/api/comments/comments/?post={self.post.pk}'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Comment.objects.create(post=self.post, author=self.user, parent=self.comment, content='Reply')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_list_etag_only_covers_its_page(self):
+        for i in range(10):
+            Comment.objects.create(post=self.post, author=self.user, content=f'Newer {i}')
+        url = f'/api/comments/comments/?post={self.post.pk}'
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+
+        # self.comment is the oldest, so it is on page 2
+        self.comment.content = 'Edited'
+        self.comment.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        newest = Comment.objects.get(content='Newer 9')
+        newest.content = 'Edited too'
+        newest.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['content'], 'Edited too')
+
+    def test_thread_filter(self):
+        other = BlogPost.objects.create(title='Other Post', content='Test content', author=self.user)
+        Comment.objects.create(post=other, author=self.user, content='Elsewhere')
+        response = self.client.get('/api/comments/comments/', {'post': self.post.pk})
+        self.assertEqual([comment['id'] for comment in response.data['results']], [self.comment.pk])
+
+    def test_comment_detail_reply_count_changes_etag(self):
+        url = f'/api/comments/comments/{self.comment.pk}/'
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.user, parent=self.comment, content='Reply')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['reply_count'], 1)
+
+    def test_missing_comment_is_still_404(self):
+        self.assertEqual(self.client.get('/api/comments/comments/999999/').status_code, 404)
+
@@ -0,0 +1,38 @@
+from .models import Comment
+
+
+def build_comment_tree(post):
+    """
+    Load every comment on a post in one query (authors joined) and attach each
+    reply to its parent's `children` list. Returns the top-level comments.
+
+    Replies keep the model's newest-first ordering, the same order
+    `comment.replies.all` would give.
+    """
+    comments = list(
+        Comment.objects.filter(post=post).select_related('author').order_by('-created_at')
+    )
+
+    by_id = {}
+    for comment in comments:
+        comment.children = []
+        by_id[comment.pk] = comment
+
+    roots = []
+    for comment in comments:
+        if comment.parent_id is None:
+            roots.append(comment)
+        else:
+            parent = by_id.get(comment.parent_id)
+            if parent is not None:
+                # Reuse the loaded parent so `reply.parent` costs no extra query
+                comment.parent = parent
+                parent.children.append(comment)
+    return roots
+
+
+'''
+build_comment_tree: Replaces the per-comment `replies.exists` / `replies.all` lookups
+in display_comments.html. The tree is assembled in Python in a single pass over the rows,
+so the cost of the detail page no longer grows with the number of comments.
+'''
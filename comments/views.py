@@ -1,6 +1,6 @@
 from django.urls import reverse_lazy
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
-from .models import Comment
+from .models import Comment, MAX_DEPTH
 from .forms import CommentForm
 from blogs.models import BlogPost
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
@@ -131,7 +131,11 @@ class ReplyCreateView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         # Get the parent comment using the provided 'pk' in the URL
         parent_comment = get_object_or_404(Comment, pk=self.kwargs['pk'])
-        
+        if parent_comment.depth >= MAX_DEPTH:
+            # The reply's materialized path would not fit in Comment.path
+            form.add_error(None, f"Replies can be nested at most {MAX_DEPTH} levels deep.")
+            return self.form_invalid(form)
+
         # Set the parent, post, and author for the reply
         form.instance.parent = parent_comment
         form.instance.post = parent_comment.post
@@ -167,10 +171,11 @@ class ReplyCreateView(LoginRequiredMixin, CreateView):
 from rest_framework import viewsets, permissions, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .models import Comment
+from .models import Comment, MAX_DEPTH
 from .serializers import CommentSerializer
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from core.conditional import ConditionalGetMixin
 
 class IsAuthorOrReadOnly(permissions.BasePermission):
     """
@@ -189,12 +194,28 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
 
 
 
-class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.all().order_by('-created_at')
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Comment.objects.select_related('author').order_by('-created_at', '-id')
     serializer_class = CommentSerializer
     authentication_classes = [JWTAuthentication, SessionAuthentication]  # Use JWTAuthentication
     permission_classes = [IsAuthorOrReadOnly, IsAuthenticated]  # Ensure permissions are set properly
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # ?post=<id> narrows the list to one post's thread
+        post_id = self.request.query_params.get('post')
+        if post_id is not None and post_id.isdigit():
+            queryset = queryset.filter(post_id=post_id)
+        return queryset
+
+    list_validator_fields = ('updated_at', 'reply_count')
+
+    def get_object_validators(self, pk):
+        comment = Comment.objects.filter(pk=pk).values('pk', 'updated_at', 'reply_count').first()
+        if comment is None:
+            return None
+        return comment, comment['updated_at']
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -0,0 +1,83 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin that answers If-None-Match / If-Modified-Since on `list` and `retrieve`
+    with a 304 before anything is serialized.
+
+    `list` pages a slim queryset (pk, ordering and `list_validator_fields` only) and builds
+    its ETag from those rows plus the pagination envelope (count, next/previous), so the cost
+    is that of the page, not the table; the full objects are loaded only for a 200.
+    get_object_validators(pk) returns (parts, last_modified) from a values() query, or None
+    (no such object) to skip straight to the normal 404.
+    """
+
+    list_validator_fields = ('updated_at',)
+
+    def get_list_validators(self, rows):
+        return [(row.pk, *(getattr(row, field) for field in self.list_validator_fields)) for row in rows]
+
+    def get_object_validators(self, pk):
+        raise NotImplementedError
+
+    def get_list_rows(self, queryset):
+        ordering = [*queryset.query.order_by, *getattr(self, 'cursor_ordering', ())]
+        fields = {'pk', *self.list_validator_fields, *(field.lstrip('-') for field in ordering)}
+        rows = queryset.select_related(None).prefetch_related(None).only(*fields)
+        page = self.paginate_queryset(rows)
+        return list(rows) if page is None else page
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.get_list_rows(queryset)
+        envelope = self.get_paginated_response([]).data if self.paginator is not None else None
+        validators = ((self.get_list_validators(rows), envelope), None)
+
+        def respond():
+            objects = queryset.in_bulk([row.pk for row in rows])
+            serializer = self.get_serializer([objects[row.pk] for row in rows if row.pk in objects], many=True)
+            if self.paginator is not None:
+                return self.get_paginated_response(serializer.data)
+            return Response(serializer.data)
+
+        return self.conditional_response(request, validators, respond)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            validators = self.get_object_validators(self.kwargs[lookup_url_kwarg])
+        except (TypeError, ValueError):
+            validators = None  # A malformed pk; let get_object() answer with its 404
+        return self.conditional_response(request, validators, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
+
+    def conditional_response(self, request, validators, respond):
+        if validators is None:
+            return respond()
+        parts, last_modified = validators
+        # The same data renders differently per page/cursor and per format (JSON, browsable API)
+        source = repr((request.get_full_path(), request.accepted_renderer.format, parts))
+        etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = respond()
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+
+'''
+A list ETag only covers the rows on the requested page (and, for page-number pagination,
+the total count), so a change elsewhere in the table doesn't invalidate every page. Lists
+send no Last-Modified: the newest updated_at cannot see a deletion or a tag rename, so list
+polling relies on If-None-Match alone.
+'''
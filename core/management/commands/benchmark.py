@@ -0,0 +1,162 @@
+import json
+import statistics
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from blogs.models import BlogPost, Tag
+from buzz.models import Buzz
+from comments.models import Comment
+from core.middleware import QueryRecorder
+from core.seeding import SCALES, DatasetGenerator
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a non-empty list of samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a reproducible dataset into a throwaway test database, time every HTML view and "
+        "API endpoint (p50/p95/p99 and query counts) and write a JSON report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--output', default='benchmark.json', help="Where to write the JSON report.")
+        parser.add_argument('--compare', help="A previous report; p95 changes are printed next to each result.")
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help="Keep the test database between runs and reuse its data instead of seeding again.",
+        )
+
+    def handle(self, *args, **options):
+        # As under core.runner: the test Client's requests would otherwise start the buzz
+        # dispatcher, whose thread would poll the benchmark database during timed requests
+        with override_settings(BUZZ_ASYNC_DELIVERY=False, BUZZ_RETENTION_INTERVAL=0):
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            if not BlogPost.objects.exists():
+                started = time.perf_counter()
+                DatasetGenerator(seed=options['seed'], stdout=self.stdout, **SCALES[options['scale']]).generate()
+                self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+            # Report over-budget views instead of aborting the run on them
+            with override_settings(QUERY_BUDGET_RAISE=False):
+                results = self.run_benchmarks(options['iterations'], options['warmup'])
+            report = {
+                'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'database': connection.vendor,
+                'scale': options['scale'],
+                'seed': options['seed'],
+                'iterations': options['iterations'],
+                'dataset': {
+                    'posts': BlogPost.objects.count(),
+                    'comments': Comment.objects.count(),
+                    'buzzes': Buzz.objects.count(),
+                    'tags': Tag.objects.count(),
+                },
+                'results': results,
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+            output.write('\n')
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as compare:
+                previous = json.load(compare).get('results', {})
+        for name, result in results.items():
+            line = f"{name:<28} p50 {result['p50_ms']:8.1f}ms  p95 {result['p95_ms']:8.1f}ms  p99 {result['p99_ms']:8.1f}ms  queries {result['queries']}"
+            if name in previous and previous[name]['p95_ms']:
+                change = (result['p95_ms'] - previous[name]['p95_ms']) / previous[name]['p95_ms'] * 100
+                line += f"  p95 {change:+.0f}%"
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def targets(self, buzz):
+        """(name, url) for every page and endpoint, pointed at the busiest rows in the dataset."""
+        post = BlogPost.objects.order_by('-comment_count').first()
+        tag = Tag.objects.annotate(post_count=Count('blog_posts')).order_by('-post_count').first()
+        last_page = (BlogPost.objects.count() - 1) // 10 + 1
+        word = post.title.split()[0].lower()
+        return [
+            ('post_list', reverse('blogs:post_list')),
+            ('post_list_last_page', reverse('blogs:post_list') + f'?page={last_page}'),
+            ('post_detail', reverse('blogs:post_detail', kwargs={'pk': post.pk})),
+            ('tag_detail', reverse('blogs:tag_detail', kwargs={'name': tag.name})),
+            ('search', reverse('search:search') + f'?query={word}'),
+            ('search_ajax', reverse('search:search_ajax') + f'?query={word[:3]}'),
+            ('suggest', reverse('search:suggest') + f'?query={word[:2]}'),
+            ('buzz_list', reverse('buzz:buzz_list')),
+            ('buzz_detail', reverse('buzz:buzz_detail', kwargs={'pk': buzz.pk})),
+            ('api_posts', '/api/blogs/posts/'),
+            ('api_posts_last_page', f'/api/blogs/posts/?page={last_page}'),
+            ('api_posts_cursor', '/api/blogs/posts/?pagination=cursor'),
+            ('api_post_detail', f'/api/blogs/posts/{post.pk}/'),
+            ('api_tags', '/api/blogs/tags/'),
+            ('api_comments', '/api/comments/comments/'),
+            ('api_comments_cursor', '/api/comments/comments/?pagination=cursor'),
+        ]
+
+    def run_benchmarks(self, iterations, warmup):
+        # Requests are made as the recipient of the newest buzz, so the buzz pages have data
+        buzz = Buzz.objects.select_related('user').order_by('-id').first()
+        user = buzz.user
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        # Cleared before every request; the API throttles would otherwise answer with 429s
+        throttle_keys = [f'throttle_user_{user.pk}', 'throttle_anon_127.0.0.1']
+
+        results = {}
+        for name, url in self.targets(buzz):
+            timings, queries, status = [], None, None
+            for i in range(warmup + iterations):
+                cache.delete_many(throttle_keys)
+                recorder = QueryRecorder()
+                with connections['default'].execute_wrapper(recorder):
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    elapsed = time.perf_counter() - started
+                status = response.status_code
+                if i >= warmup:
+                    timings.append(elapsed * 1000)
+                    queries = recorder.count
+            results[name] = {
+                'url': url,
+                'status': status,
+                'queries': queries,
+                'mean_ms': round(statistics.mean(timings), 2),
+                'p50_ms': round(percentile(timings, 0.50), 2),
+                'p95_ms': round(percentile(timings, 0.95), 2),
+                'p99_ms': round(percentile(timings, 0.99), 2),
+            }
+            self.stdout.write(f"Timed {name}")
+        return results
+
+
+'''
+The dataset is generated into Django's test database (test_<NAME>), never the configured one,
+and the same --scale and --seed always produce the same rows, so reports from different
+commits are comparable. Use --keepdb to seed once and rerun against the same data.
+
+Reports are written with sorted keys so `git diff --no-index old.json new.json` shows only
+the numbers that moved; --compare prints the p95 change per endpoint.
+'''
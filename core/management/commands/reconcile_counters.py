@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from blogs.models import BlogPost
+from comments.models import Comment
+from buzz.models import UnreadBuzzCount
+
+
+def count_subquery(queryset, field):
+    """Correlated COUNT(*) of `queryset` grouped on `field`, for use in an UPDATE."""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk'))
+    return Coalesce(Subquery(counts.values('total')), 0)
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized counters (post comment counts, reply counts, unread buzz counts)."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            posts = BlogPost.objects.update(comment_count=count_subquery(Comment.objects.all(), 'post'))
+            comments = Comment.objects.update(reply_count=count_subquery(Comment.objects.all(), 'parent'))
+            UnreadBuzzCount.recount()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled comment counts on {posts} posts, reply counts on {comments} comments and unread buzz counts."
+        ))
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from comments.models import MAX_DEPTH
+from core.seeding import SCALES, DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate users, tags, posts, tag links, comments and buzzes for load testing. "
+        "Uses COPY on PostgreSQL and batched bulk_create elsewhere; the same options and seed "
+        "always produce the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small', help="Base sizes; the options below override them.")
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--tags', type=int)
+        parser.add_argument('--posts', type=int)
+        parser.add_argument('--comments', type=int)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--tags-per-post', type=int, nargs=2, default=(0, 4), metavar=('MIN', 'MAX'))
+        parser.add_argument('--comment-distribution', choices=['pareto', 'uniform'], default='pareto')
+        parser.add_argument('--comment-skew', type=float, default=1.5, help="Pareto shape; lower puts more comments on fewer posts.")
+        parser.add_argument('--reply-ratio', type=float, default=0.6, help="Share of comments that are replies.")
+        parser.add_argument('--chain-ratio', type=float, default=0.5, help="Share of replies answering the latest comment.")
+        parser.add_argument('--max-depth', type=int, default=20, help="Deepest reply level.")
+        parser.add_argument('--read-ratio', type=float, default=0.7, help="Share of buzzes already read.")
+        parser.add_argument('--days', type=int, default=365, help="Spread post dates over this many past days.")
+        parser.add_argument('--no-copy', action='store_true', help="Use bulk_create even on PostgreSQL.")
+
+    def handle(self, *args, **options):
+        sizes = dict(SCALES[options['scale']])
+        for name in sizes:
+            if options[name] is not None:
+                sizes[name] = options[name]
+        if sizes['users'] < 1 or sizes['posts'] < 1:
+            raise CommandError("At least one user and one post are needed.")
+        low, high = options['tags_per_post']
+        if not 0 <= low <= high:
+            raise CommandError("--tags-per-post expects 0 <= MIN <= MAX.")
+        if not 0 <= options['max_depth'] <= MAX_DEPTH:
+            raise CommandError(f"--max-depth must be between 0 and {MAX_DEPTH} (the comment path length limit).")
+
+        generator = DatasetGenerator(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            tags_per_post=(low, high),
+            comment_distribution=options['comment_distribution'],
+            comment_skew=options['comment_skew'],
+            reply_ratio=options['reply_ratio'],
+            chain_ratio=options['chain_ratio'],
+            max_depth=options['max_depth'],
+            read_ratio=options['read_ratio'],
+            days=options['days'],
+            use_copy=False if options['no_copy'] else None,
+            stdout=self.stdout,
+            **sizes,
+        )
+        started = time.perf_counter()
+        generator.generate()
+        method = 'COPY' if generator.use_copy else 'bulk_create'
+        self.stdout.write(self.style.SUCCESS(f"Seeded with {method} in {time.perf_counter() - started:.1f}s."))
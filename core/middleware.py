@@ -0,0 +1,119 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('core.queries')
+
+# Literals are stripped so the same statement with different parameters shares a fingerprint
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+
+
+def fingerprint(sql):
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return ' '.join(sql.split())
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper hook counting and timing every query run while it is installed.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """{fingerprint: times run} for statements run more than once, the usual sign of an N+1."""
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record the queries each request runs and report them in a Server-Timing header and a log
+    line on the `core.queries` logger. GET requests to views named in settings.QUERY_BUDGETS
+    ({'app:url_name': max_queries}) that go over budget raise QueryBudgetExceeded when
+    settings.QUERY_BUDGET_RAISE is set, and log a warning otherwise.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        duplicates = recorder.duplicates
+
+        response['Server-Timing'] = 'db;dur=%.1f;desc="%d queries, %d duplicated", total;dur=%.1f' % (
+            recorder.duration * 1000, recorder.count, len(duplicates), total * 1000,
+        )
+        logger.info(
+            'view=%s status=%s queries=%d sql_ms=%.1f total_ms=%.1f duplicated=%d',
+            view_name, response.status_code, recorder.count, recorder.duration * 1000, total * 1000, len(duplicates),
+            extra={
+                'view_name': view_name,
+                'path': request.path,
+                'status': response.status_code,
+                'query_count': recorder.count,
+                'sql_ms': recorder.duration * 1000,
+                'total_ms': total * 1000,
+                'duplicate_queries': duplicates,
+            },
+        )
+
+        if request.method in ('GET', 'HEAD'):
+            self.check_budget(view_name, recorder)
+        return response
+
+    def check_budget(self, view_name, recorder):
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+        if budget is None or recorder.count <= budget:
+            return
+        message = '%s ran %d queries (budget %d); repeated: %s' % (
+            view_name, recorder.count, budget, list(recorder.duplicates) or 'none',
+        )
+        if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+'''
+QueryRecorder is installed with connection.execute_wrapper() for the duration of the request,
+so it sees every query the view and its templates run (but not queries made while a streaming
+response is consumed, which happens after the middleware returns).
+
+Fingerprints replace literals with `?` and collapse IN lists, so the same lookup repeated for
+each row of a list shows up as one fingerprint run many times.
+'''
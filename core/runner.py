@@ -0,0 +1,22 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    The default runner, with buzzes delivered synchronously (BUZZ_ASYNC_DELIVERY=False).
+
+    TestCase wraps each test in a transaction that is never committed, so a queued buzz
+    would never reach the outbox worker, and a worker thread started by the test client's
+    requests would race the tests for the database. Tests of the outbox itself turn async
+    delivery back on with override_settings.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.buzz_delivery = override_settings(BUZZ_ASYNC_DELIVERY=False)
+        self.buzz_delivery.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.buzz_delivery.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,299 @@
+import csv
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from blogs.models import BlogPost, Tag
+from blogs.page_cache import bump_page_versions, list_scope
+from buzz.models import Buzz
+from comments.models import Comment, PATH_STEP
+
+
+WORDS = (
+    'django python postgres index query cache search comment reply thread buzz tag post blog '
+    'performance latency cursor page scan join prefetch select related model view template api '
+    'rest serializer token session user author draft release deploy worker queue signal counter '
+    'async stream export import batch bulk copy benchmark profile memory disk network server '
+    'client browser static media image video music travel food garden coffee weekend story'
+).split()
+
+SEED_PASSWORD = 'password123'
+
+# Named dataset sizes shared by seed_data and benchmark
+SCALES = {
+    'small': {'users': 500, 'tags': 50, 'posts': 2000, 'comments': 20000},
+    'medium': {'users': 5000, 'tags': 200, 'posts': 20000, 'comments': 200000},
+    'large': {'users': 50000, 'tags': 500, 'posts': 100000, 'comments': 1000000},
+}
+
+COPY_NULL = '\\N'
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Switch off auto_now/auto_now_add on the given models for the duration of the block, so
+    generated rows keep the created_at/updated_at spread they were given instead of `now`.
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def reset_sequences(*models):
+    """Move PostgreSQL id sequences past the explicitly assigned ids (a no-op on SQLite)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def copy_rows(model, objects):
+    """
+    Write unsaved model instances with PostgreSQL `COPY ... FROM STDIN` (CSV), which skips
+    per-row INSERT parsing and planning entirely. Values go through get_db_prep_save() just
+    as they would for an INSERT; a None primary key leaves the id to its sequence.
+    """
+    if not objects:
+        return
+    fields = [field for field in model._meta.concrete_fields if not (field.primary_key and objects[0].pk is None)]
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    for obj in objects:
+        row = []
+        for field in fields:
+            value = field.get_db_prep_save(getattr(obj, field.attname), connection)
+            row.append(COPY_NULL if value is None else value)
+        writer.writerow(row)
+    buffer.seek(0)
+
+    quote = connection.ops.quote_name
+    sql = "COPY %s (%s) FROM STDIN WITH (FORMAT csv, NULL '%s')" % (
+        quote(model._meta.db_table), ', '.join(quote(field.column) for field in fields), COPY_NULL,
+    )
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):  # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+class DatasetGenerator:
+    """
+    Generate a reproducible dataset with bulk inserts: the same arguments and seed always
+    produce the same rows.
+
+    Ids are assigned up front, so comment paths and parent links are known before anything
+    is written, and nothing goes through Model.save() or the post_save signals. Buzzes are
+    generated the way create_buzz_on_comment would (one per comment on someone else's post),
+    and the denormalized counters are reconciled once at the end. Rows are written with
+    bulk_create in batches, or with COPY on PostgreSQL unless use_copy=False.
+
+    Shape of the data:
+    - tags_per_post: (min, max) tags linked to each post
+    - comment_distribution: 'pareto' (a few posts get most comments, skewed by comment_skew;
+      lower is more skewed) or 'uniform'
+    - reply_ratio: share of comments that are replies rather than top-level
+    - chain_ratio: share of replies that answer the latest comment, building deep chains
+    - max_depth: deepest reply level
+    - read_ratio: share of buzzes already read
+    """
+
+    def __init__(self, users=500, tags=50, posts=1000, comments=10000, seed=0, batch_size=5000,
+                 tags_per_post=(0, 4), comment_distribution='pareto', comment_skew=1.5,
+                 reply_ratio=0.6, chain_ratio=0.5, max_depth=20, read_ratio=0.7, days=365,
+                 use_copy=None, stdout=None):
+        self.counts = {'users': users, 'tags': tags, 'posts': posts, 'comments': comments}
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.tags_per_post = tags_per_post
+        self.comment_distribution = comment_distribution
+        self.comment_skew = comment_skew
+        self.reply_ratio = reply_ratio
+        self.chain_ratio = chain_ratio
+        self.max_depth = max_depth
+        self.read_ratio = read_ratio
+        self.start = timezone.now() - timedelta(days=days)
+        self.span = timedelta(days=days)
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.stdout = stdout
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def text(self, words):
+        return ' '.join(self.rng.choices(WORDS, k=words))
+
+    def generate(self):
+        with transaction.atomic(), explicit_timestamps(BlogPost, Comment, Buzz):
+            user_ids = self.create_users()
+            tag_ids = self.create_tags()
+            posts = self.create_posts(user_ids)
+            self.link_tags(posts, tag_ids)
+            self.create_comments(posts, user_ids)
+            reset_sequences(get_user_model(), Tag, BlogPost, Comment, Buzz)
+
+        call_command('reconcile_counters', stdout=StringIO())
+        self.refresh_search()
+        # New posts get fresh page versions of their own; only the list pages are stale
+        bump_page_versions([list_scope()])
+
+    def write(self, model, objects):
+        if self.use_copy:
+            copy_rows(model, objects)
+        else:
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def create_users(self):
+        User = get_user_model()
+        first = next_id(User)
+        password = make_password(SEED_PASSWORD)  # hashed once, shared by every seeded user
+        ids = list(range(first, first + self.counts['users']))
+        self.write(User, [
+            User(id=pk, username=f'seed_user_{pk}', email=f'seed_user_{pk}@example.com', password=password)
+            for pk in ids
+        ])
+        self.log(f"Created {len(ids)} users")
+        return ids
+
+    def create_tags(self):
+        first = next_id(Tag)
+        ids = list(range(first, first + self.counts['tags']))
+        self.write(Tag, [Tag(id=pk, name=f'{self.rng.choice(WORDS)}-{pk}') for pk in ids])
+        self.log(f"Created {len(ids)} tags")
+        return ids
+
+    def create_posts(self, user_ids):
+        """Posts spread evenly over the time window, oldest first; returns (id, author_id, created_at)."""
+        first = next_id(BlogPost)
+        total = self.counts['posts']
+        posts, batch = [], []
+        for i in range(total):
+            pk = first + i
+            created_at = self.start + self.span * (i / max(total, 1))
+            author_id = self.rng.choice(user_ids)
+            posts.append((pk, author_id, created_at))
+            batch.append(BlogPost(
+                id=pk, author_id=author_id, created_at=created_at, updated_at=created_at,
+                title=self.text(self.rng.randint(3, 8)).capitalize(),
+                content=self.text(self.rng.randint(60, 300)),
+            ))
+            if len(batch) >= self.batch_size:
+                self.write(BlogPost, batch)
+                batch = []
+        self.write(BlogPost, batch)
+        self.log(f"Created {total} posts")
+        return posts
+
+    def link_tags(self, posts, tag_ids):
+        Through = BlogPost.tags.through
+        links = []
+        for pk, author_id, created_at in posts:
+            count = min(len(tag_ids), self.rng.randint(*self.tags_per_post))
+            for tag_id in self.rng.sample(tag_ids, count):
+                links.append(Through(blogpost_id=pk, tag_id=tag_id))
+            if len(links) >= self.batch_size:
+                self.write(Through, links)
+                links = []
+        self.write(Through, links)
+
+    def comments_per_post(self, posts):
+        """Split the comment total over posts according to comment_distribution."""
+        if self.comment_distribution == 'uniform':
+            weights = [1.0 for _ in posts]
+        else:
+            weights = [self.rng.paretovariate(self.comment_skew) for _ in posts]
+        scale = self.counts['comments'] / (sum(weights) or 1)
+        counts = [int(weight * scale) for weight in weights]
+        for i in range(self.counts['comments'] - sum(counts)):
+            counts[i % len(counts)] += 1
+        return counts
+
+    def create_comments(self, posts, user_ids):
+        if not posts:
+            return
+        comment_id = next_id(Comment)
+        buzz_id = next_id(Buzz)
+        comments, buzzes = [], []
+        buzz_total = 0
+
+        for (post_id, post_author_id, post_created_at), count in zip(posts, self.comments_per_post(posts)):
+            thread = []  # (id, path, depth) of the post's comments so far
+            created_at = post_created_at
+            for _ in range(count):
+                created_at += timedelta(seconds=self.rng.randint(30, 6 * 3600))
+                parent = None
+                if thread and self.rng.random() < self.reply_ratio:
+                    # Replying to the latest comment builds deep chains; otherwise reply anywhere
+                    parent = thread[-1] if self.rng.random() < self.chain_ratio else self.rng.choice(thread)
+                    if parent[2] >= self.max_depth:
+                        parent = None
+
+                segment = str(comment_id).zfill(PATH_STEP)
+                path = parent[1] + segment if parent else segment
+                author_id = self.rng.choice(user_ids)
+                comments.append(Comment(
+                    id=comment_id, post_id=post_id, author_id=author_id, parent_id=parent[0] if parent else None,
+                    path=path, content=self.text(self.rng.randint(5, 60)), created_at=created_at, updated_at=created_at,
+                ))
+                thread.append((comment_id, path, parent[2] + 1 if parent else 0))
+
+                if author_id != post_author_id:
+                    buzzes.append(Buzz(
+                        id=buzz_id, user_id=post_author_id, trigger_id=author_id, post_id=post_id,
+                        comment_id=comment_id, is_read=self.rng.random() < self.read_ratio, created_at=created_at,
+                    ))
+                    buzz_id += 1
+                comment_id += 1
+
+                if len(comments) >= self.batch_size:
+                    self.write(Comment, comments)
+                    comments = []
+                if len(buzzes) >= self.batch_size:
+                    # Comments are always flushed first, so every buzz's comment already exists
+                    self.write(Comment, comments)
+                    self.write(Buzz, buzzes)
+                    buzz_total += len(buzzes)
+                    comments, buzzes = [], []
+
+        self.write(Comment, comments)
+        self.write(Buzz, buzzes)
+        buzz_total += len(buzzes)
+        self.log(f"Created {self.counts['comments']} comments and {buzz_total} buzzes")
+
+    def refresh_search(self):
+        """Fill PostgreSQL search vectors and drop the in-process indexes so they rebuild."""
+        from search.autocomplete import autocomplete
+        from search.backends import get_search_backend, search_vector_expression
+
+        if connection.vendor == 'postgresql':
+            BlogPost.objects.update(search_vector=search_vector_expression())
+        backend = get_search_backend()
+        if hasattr(backend, 'reset'):
+            backend.reset()
+        autocomplete.reset()
@@ -0,0 +1,26 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+
+def is_asgi_request(request):
+    """True when `request` (a Django or DRF request) is being served by the ASGI handler."""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def iterate_in_thread(iterable, chunk_size):
+    """
+    Async iterator over a sync one (say, a generator reading the database), advanced
+    `chunk_size` items at a time in a worker thread; each chunk is yielded joined.
+
+    StreamingHttpResponse given a sync iterator under ASGI reads it whole with
+    sync_to_async(list) before sending a byte, so a large stream would sit in memory.
+    """
+    iterator = iter(iterable)
+    take = sync_to_async(lambda: list(islice(iterator, chunk_size)))
+    while True:
+        chunk = await take()
+        if not chunk:
+            return
+        yield b''.join(chunk)
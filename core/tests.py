@@ -0,0 +1,201 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from blogs.models import BlogPost, Tag
+from buzz.models import ArchivedBuzz, Buzz, UnreadBuzzCount
+from comments.models import Comment
+from .middleware import QueryBudgetExceeded, fingerprint
+from .seeding import DatasetGenerator
+
+
+
+
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are only checked on PostgreSQL')
+class QueryPlanTest(TestCase):
+    """
+    Replay the SQL issued by the main pages under EXPLAIN with sequential scans disabled.
+    PostgreSQL still picks a Seq Scan when no index can answer a query, so one showing up
+    in the plan means a hot path has lost its index.
+    """
+    tables = ('blogs_blogpost', 'comments_comment', 'buzz_buzz')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password123')
+        cls.reader = User.objects.create_user(username='reader', password='password123')
+        cls.tag = Tag.objects.create(name='django')
+        for i in range(15):
+            post = BlogPost.objects.create(title=f'Post {i}', content=f'Django content {i}', author=cls.author)
+            post.tags.add(cls.tag)
+        cls.post = post
+        for i in range(5):
+            comment = Comment.objects.create(post=cls.post, author=cls.reader, content=f'Comment {i}')
+            Comment.objects.create(post=cls.post, author=cls.author, parent=comment, content=f'Reply {i}')
+        cls.buzz = Buzz.objects.filter(user=cls.author).first()
+
+    def assertNoSeqScan(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        with connection.cursor() as cursor:
+            # Only for the rest of the test transaction
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or not any(table in sql for table in self.tables):
+                    continue
+                cursor.execute('EXPLAIN ' + sql)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                for table in self.tables:
+                    self.assertNotIn(f'Seq Scan on {table}', plan, f'{url}\n{sql}\n{plan}')
+
+    def test_post_pages(self):
+        self.assertNoSeqScan(reverse('blogs:post_list'))
+        self.assertNoSeqScan(reverse('blogs:post_detail', kwargs={'pk': self.post.pk}))
+        self.assertNoSeqScan(reverse('blogs:tag_detail', kwargs={'name': self.tag.name}))
+        self.assertNoSeqScan(reverse('search:search') + '?query=django')
+
+    def test_buzz_pages(self):
+        self.client.login(username='author', password='password123')
+        self.assertNoSeqScan(reverse('buzz:buzz_list'))
+        self.assertNoSeqScan(reverse('buzz:buzz_detail', kwargs={'pk': self.buzz.pk}))
+
+    def test_api_lists(self):
+        self.client.login(username='author', password='password123')
+        self.assertNoSeqScan('/api/blogs/posts/')
+        self.assertNoSeqScan('/api/blogs/posts/?pagination=cursor')
+        self.assertNoSeqScan('/api/comments/comments/')
+
+
+
+
+
+
+class QueryInstrumentationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password123')
+        for i in range(3):
+            BlogPost.objects.create(title=f'Post {i}', content='Content', author=cls.author)
+
+    def setUp(self):
+        cache.clear()  # Cached post cards would save the tags query
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('blogs:post_list'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="3 queries, 0 duplicated", total;dur=[\d.]+$')
+
+    def test_fingerprint_ignores_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 12 AND name = 'a''b'"),
+            fingerprint("SELECT * FROM t WHERE id = 7 AND name = 'c'"),
+        )
+
+    def test_request_is_logged(self):
+        with self.assertLogs('core.queries', level='INFO') as logs:
+            self.client.get(reverse('blogs:post_list'))
+        self.assertIn('view=blogs:post_list', logs.output[0])
+        self.assertIn('queries=3', logs.output[0])
+
+    @override_settings(QUERY_BUDGETS={'blogs:post_list': 2}, QUERY_BUDGET_RAISE=True)
+    def test_over_budget_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('blogs:post_list'))
+
+    @override_settings(QUERY_BUDGETS={'blogs:post_list': 2}, QUERY_BUDGET_RAISE=False)
+    def test_over_budget_warns(self):
+        with self.assertLogs('core.queries', level='WARNING') as logs:
+            response = self.client.get(reverse('blogs:post_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('blogs:post_list ran 3 queries (budget 2)', logs.output[-1])
+
+
+
+
+
+
+class DatasetGeneratorTest(TestCase):
+    def generate(self, seed=0):
+        DatasetGenerator(users=5, tags=4, posts=10, comments=60, seed=seed, batch_size=7).generate()
+
+    def test_row_counts_and_counters(self):
+        self.generate()
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(BlogPost.objects.count(), 10)
+        self.assertEqual(Comment.objects.count(), 60)
+        post = BlogPost.objects.order_by('-comment_count').first()
+        self.assertEqual(post.comment_count, post.comments.count())
+        # One buzz per comment on someone else's post, as create_buzz_on_comment would do
+        self.assertEqual(Buzz.objects.count(), Comment.objects.exclude(author=F('post__author')).count())
+
+    def test_reply_paths_extend_parent_paths(self):
+        self.generate()
+        replies = Comment.objects.filter(parent__isnull=False).select_related('parent')
+        self.assertTrue(replies.exists())
+        for reply in replies:
+            self.assertEqual(reply.path, reply.parent.path + str(reply.pk).zfill(10))
+            self.assertEqual(reply.post_id, reply.parent.post_id)
+
+    def test_same_seed_same_data(self):
+        self.generate(seed=3)
+        first = list(Comment.objects.order_by('id').values_list('content', 'parent__content'))
+        Comment.objects.all().delete()
+        BlogPost.objects.all().delete()
+        Tag.objects.all().delete()
+        User.objects.all().delete()
+        self.generate(seed=3)
+        second = list(Comment.objects.order_by('id').values_list('content', 'parent__content'))
+        self.assertEqual(first, second)
+
+    def test_seed_data_command(self):
+        call_command(
+            'seed_data', users=3, tags=2, posts=4, comments=20, tags_per_post=[1, 1],
+            comment_distribution='uniform', max_depth=0, stdout=StringIO(),
+        )
+        self.assertEqual(BlogPost.objects.count(), 4)
+        # Uniform spread, one tag per post, and max_depth=0 leaves no replies
+        self.assertEqual(set(BlogPost.objects.values_list('comment_count', flat=True)), {5})
+        self.assertEqual(BlogPost.tags.through.objects.count(), 4)
+        self.assertFalse(Comment.objects.filter(parent__isnull=False).exists())
+
+    def test_export_posts_command(self):
+        self.generate()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.ndjson.gz')
+            call_command('export_posts', output=path, gzip=True, chunk_size=3, stdout=StringIO())
+            with gzip.open(path, 'rt') as export:
+                records = [json.loads(line) for line in export]
+        self.assertEqual([record['id'] for record in records], list(BlogPost.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual(sum(len(record['comments']) for record in records), 60)
+
+    def test_archive_buzzes_command(self):
+        self.generate()
+        cutoff = timezone.now() - timedelta(days=30)
+        old_read = set(Buzz.objects.filter(is_read=True, created_at__lt=cutoff).values_list('pk', flat=True))
+        unread = dict(UnreadBuzzCount.objects.values_list('user_id', 'unread_count'))
+        self.assertTrue(old_read)
+
+        out = StringIO()
+        call_command('archive_buzzes', days=30, batch_size=7, stdout=out)
+        self.assertIn(f"Archived {len(old_read)} read buzzes", out.getvalue())
+        self.assertFalse(Buzz.objects.filter(is_read=True, created_at__lt=cutoff).exists())
+        self.assertEqual(set(ArchivedBuzz.objects.values_list('pk', flat=True)), old_read)
+        self.assertEqual(dict(UnreadBuzzCount.objects.values_list('user_id', 'unread_count')), unread)
+
@@ -0,0 +1,153 @@
+import bisect
+import threading
+
+from django.db.models import Count
+from blogs.models import BlogPost, Tag
+from .backends import tokenize
+
+
+def word_start_keys(text):
+    """
+    Every word-start suffix of the normalized text, so a prefix of any word matches:
+    'Django performance tips' -> ['django performance tips', 'performance tips', 'tips'].
+    """
+    terms = tokenize(text)
+    return [' '.join(terms[i:]) for i in range(len(terms))]
+
+
+class PrefixIndex:
+    """
+    Sorted array of (key, pk) pairs. Lookups are a bisect plus a scan over the matching
+    range; inserts and removals keep the array sorted.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.labels = {}
+
+    def add(self, pk, label):
+        self.remove(pk)
+        self.labels[pk] = label
+        for key in word_start_keys(label):
+            bisect.insort(self.entries, (key, pk))
+
+    def remove(self, pk):
+        label = self.labels.pop(pk, None)
+        if label is None:
+            return
+        for key in word_start_keys(label):
+            index = bisect.bisect_left(self.entries, (key, pk))
+            if index < len(self.entries) and self.entries[index] == (key, pk):
+                del self.entries[index]
+
+    def load(self, rows):
+        """Bulk-load (pk, label) rows, sorting once instead of inserting one by one."""
+        self.labels = dict(rows)
+        self.entries = sorted(
+            (key, pk) for pk, label in self.labels.items() for key in word_start_keys(label)
+        )
+
+    def matches(self, prefix, limit=None):
+        """Distinct pks with a word starting with `prefix`, in key order."""
+        prefix = ' '.join(tokenize(prefix))
+        if not prefix:
+            return []
+        found, seen = [], set()
+        index = bisect.bisect_left(self.entries, (prefix,))
+        while index < len(self.entries) and self.entries[index][0].startswith(prefix):
+            pk = self.entries[index][1]
+            if pk not in seen:
+                seen.add(pk)
+                found.append(pk)
+                if limit is not None and len(found) >= limit:
+                    break
+            index += 1
+        return found
+
+
+
+
+
+
+class Autocomplete:
+    """
+    In-process title and tag-name suggestions that never touch the database once built.
+    The index is loaded from the database on first use and then kept current by the
+    signal handlers in search.signals; tag post counts are tracked to rank tag suggestions.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.titles = None
+        self.tags = None
+        self.tag_post_counts = {}
+
+    def reset(self):
+        with self.lock:
+            self.titles = None
+            self.tags = None
+            self.tag_post_counts = {}
+
+    def ensure_built(self):
+        with self.lock:
+            if self.titles is not None:
+                return
+            titles = PrefixIndex()
+            titles.load(BlogPost.objects.values_list('id', 'title').iterator())
+            tags = PrefixIndex()
+            rows = list(Tag.objects.annotate(post_count=Count('blog_posts')).values_list('id', 'name', 'post_count'))
+            tags.load((pk, name) for pk, name, post_count in rows)
+            self.tag_post_counts = {pk: post_count for pk, name, post_count in rows}
+            self.titles, self.tags = titles, tags
+
+    def suggest(self, prefix, limit=5):
+        self.ensure_built()
+        with self.lock:
+            posts = [
+                {'id': pk, 'title': self.titles.labels[pk]}
+                for pk in self.titles.matches(prefix, limit)
+            ]
+            tag_ids = sorted(self.tags.matches(prefix), key=lambda pk: -self.tag_post_counts.get(pk, 0))
+            tags = [
+                {'name': self.tags.labels[pk], 'post_count': self.tag_post_counts.get(pk, 0)}
+                for pk in tag_ids[:limit]
+            ]
+        return {'posts': posts, 'tags': tags}
+
+    # Incremental updates (no-ops until the index has been built)
+
+    def update_post(self, post):
+        with self.lock:
+            if self.titles is not None:
+                self.titles.add(post.pk, post.title)
+
+    def remove_post(self, post_id):
+        with self.lock:
+            if self.titles is not None:
+                self.titles.remove(post_id)
+
+    def update_tag(self, tag):
+        with self.lock:
+            if self.tags is not None:
+                self.tags.add(tag.pk, tag.name)
+                self.tag_post_counts.setdefault(tag.pk, 0)
+
+    def remove_tag(self, tag_id):
+        with self.lock:
+            if self.tags is not None:
+                self.tags.remove(tag_id)
+                self.tag_post_counts.pop(tag_id, None)
+
+    def refresh_tag_counts(self, tag_ids):
+        with self.lock:
+            if self.tags is None or not tag_ids:
+                return
+        counts = list(
+            Tag.objects.filter(pk__in=tag_ids).annotate(post_count=Count('blog_posts')).values_list('id', 'post_count')
+        )
+        with self.lock:
+            if self.tags is not None:
+                self.tag_post_counts.update(counts)
+
+
+autocomplete = Autocomplete()
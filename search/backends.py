@@ -0,0 +1,238 @@
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, FloatField, Value, When
+from django.utils.module_loading import import_string
+from blogs.models import BlogPost
+
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Title matches count for more than body matches, mirroring the A/B weights used in PostgreSQL
+TITLE_WEIGHT = 1.0
+CONTENT_WEIGHT = 0.4
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def prefix_tsquery(terms):
+    """
+    Raw tsquery text ANDing the terms, with the last one matched as a prefix ('a & b & c:*').
+    Terms come from tokenize(), so they only contain word characters.
+    """
+    return ' & '.join(terms[:-1] + [terms[-1] + ':*'])
+
+
+class BaseSearchBackend:
+    """
+    A search backend returns BlogPost querysets ordered by relevance, annotated with `rank`,
+    and is told about post saves/deletes so it can keep its index current.
+
+    With prefix=True the last query term also matches longer words ('djan' finds 'django'),
+    which is what search-as-you-type needs.
+
+    `stems` is True when query terms are reduced to stems before matching. A stemmed prefix
+    query can then match fewer posts than a shorter one ('runn:*' misses the 'run' stored for
+    "running"), so callers must not narrow a longer query to a prefix's results.
+    """
+
+    stems = False
+
+    def search(self, query, queryset=None, prefix=False):
+        raise NotImplementedError
+
+    def index_post(self, post):
+        pass
+
+    def index_posts(self, posts):
+        for post in posts:
+            self.index_post(post)
+
+    def remove_post(self, post_id):
+        pass
+
+
+
+
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Full-text search over the stored, GIN-indexed BlogPost.search_vector column.
+    """
+
+    stems = True
+
+    def search(self, query, queryset=None, prefix=False):
+        queryset = BlogPost.objects.all() if queryset is None else queryset
+        if prefix:
+            terms = tokenize(query)
+            if not terms:
+                return queryset.none()
+            search_query = SearchQuery(prefix_tsquery(terms), search_type='raw')
+        else:
+            search_query = SearchQuery(query, search_type='websearch')
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank('search_vector', search_query)
+        ).order_by('-rank', '-created_at')
+
+    def index_post(self, post):
+        # update() writes the vector in SQL without re-firing post_save or touching updated_at
+        BlogPost.objects.filter(pk=post.pk).update(search_vector=search_vector_expression())
+
+    def index_posts(self, posts):
+        # One UPDATE for a whole bulk import
+        BlogPost.objects.filter(pk__in=[post.pk for post in posts]).update(search_vector=search_vector_expression())
+
+
+
+
+
+
+class InvertedIndexSearchBackend(BaseSearchBackend):
+    """
+    In-process inverted index for databases without full-text search (SQLite in development
+    and tests). Built from the database on first use and kept current through signals.
+
+    Terms are ANDed like PostgreSQL's websearch queries and ranked by weighted tf-idf.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = None  # term -> {post_id: weighted term frequency}
+        self.documents = {}  # post_id -> set of terms, for removal
+        self.vocabulary = []  # sorted terms, for prefix lookups
+
+    def reset(self):
+        """Drop the index; it is rebuilt from the database on the next search."""
+        with self.lock:
+            self.postings = None
+            self.documents = {}
+            self.vocabulary = []
+
+    def build(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        for post_id, title, content in BlogPost.objects.values_list('id', 'title', 'content').iterator():
+            self._add(post_id, title, content, update_vocabulary=False)
+        self.vocabulary = sorted(self.postings)
+
+    def _ensure_built(self):
+        with self.lock:
+            if self.postings is None:
+                self.build()
+
+    def _add(self, post_id, title, content, update_vocabulary=True):
+        weights = defaultdict(float)
+        for term in tokenize(title):
+            weights[term] += TITLE_WEIGHT
+        for term in tokenize(content):
+            weights[term] += CONTENT_WEIGHT
+        for term, weight in weights.items():
+            if update_vocabulary and term not in self.postings:
+                bisect.insort(self.vocabulary, term)
+            self.postings[term][post_id] = weight
+        self.documents[post_id] = set(weights)
+
+    def _remove(self, post_id):
+        for term in self.documents.pop(post_id, ()):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(post_id, None)
+                if not posting:
+                    del self.postings[term]
+                    index = bisect.bisect_left(self.vocabulary, term)
+                    if index < len(self.vocabulary) and self.vocabulary[index] == term:
+                        del self.vocabulary[index]
+
+    def index_post(self, post):
+        with self.lock:
+            if self.postings is not None:
+                self._remove(post.pk)
+                self._add(post.pk, post.title, post.content)
+
+    def remove_post(self, post_id):
+        with self.lock:
+            if self.postings is not None:
+                self._remove(post_id)
+
+    def _prefix_posting(self, prefix):
+        """Merge the postings of every indexed term starting with `prefix`."""
+        merged = defaultdict(float)
+        index = bisect.bisect_left(self.vocabulary, prefix)
+        while index < len(self.vocabulary) and self.vocabulary[index].startswith(prefix):
+            for post_id, weight in self.postings[self.vocabulary[index]].items():
+                merged[post_id] += weight
+            index += 1
+        return merged
+
+    def rank(self, query, prefix=False):
+        """
+        Return {post_id: score} for posts containing every term in the query.
+        """
+        self._ensure_built()
+        terms = tokenize(query)
+        if not terms:
+            return {}
+
+        with self.lock:
+            postings = [self.postings.get(term, {}) for term in set(terms[:-1] if prefix else terms)]
+            if prefix:
+                postings.append(self._prefix_posting(terms[-1]))
+            if not all(postings):
+                return {}
+            total = len(self.documents) or 1
+            matches = set.intersection(*(set(posting) for posting in postings))
+            scores = {}
+            for post_id in matches:
+                scores[post_id] = sum(
+                    posting[post_id] * math.log(1 + total / len(posting)) for posting in postings
+                )
+        return scores
+
+    def search(self, query, queryset=None, prefix=False):
+        queryset = BlogPost.objects.all() if queryset is None else queryset
+        scores = self.rank(query, prefix=prefix)
+        if not scores:
+            return queryset.none()
+        rank = Case(
+            *[When(pk=post_id, then=Value(score)) for post_id, score in scores.items()],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=scores).annotate(rank=rank).order_by('-rank', '-created_at')
+
+
+
+
+
+
+def search_vector_expression():
+    return SearchVector('title', weight='A') + SearchVector('content', weight='B')
+
+
+_backend = None
+
+
+def get_search_backend():
+    """
+    Return the configured backend (settings.SEARCH_BACKEND, a dotted path), defaulting to
+    PostgreSQL full-text search on PostgreSQL and the inverted index everywhere else.
+    """
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'SEARCH_BACKEND', None)
+        if path:
+            _backend = import_string(path)()
+        elif connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        else:
+            _backend = InvertedIndexSearchBackend()
+    return _backend
@@ -0,0 +1,72 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from blogs.models import BlogPost, Tag
+from blogs.signals import posts_imported
+from .autocomplete import autocomplete
+from .backends import get_search_backend
+
+@receiver(post_save, sender=BlogPost)
+def index_post_on_save(sender, instance, **kwargs):
+    """
+    Keep the search index (the stored tsvector or the in-process inverted index) and the
+    title autocomplete index current.
+    """
+    get_search_backend().index_post(instance)
+    autocomplete.update_post(instance)
+
+
+@receiver(pre_delete, sender=BlogPost)
+def remember_post_tags(sender, instance, **kwargs):
+    # The through rows are gone by post_delete, so note which tag counts will change
+    if autocomplete.tags is not None:
+        instance._autocomplete_tag_ids = list(instance.tags.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=BlogPost)
+def remove_post_on_delete(sender, instance, **kwargs):
+    get_search_backend().remove_post(instance.pk)
+    autocomplete.remove_post(instance.pk)
+    autocomplete.refresh_tag_counts(getattr(instance, '_autocomplete_tag_ids', []))
+
+
+@receiver(post_save, sender=Tag)
+def index_tag_on_save(sender, instance, **kwargs):
+    autocomplete.update_tag(instance)
+
+
+@receiver(post_delete, sender=Tag)
+def remove_tag_on_delete(sender, instance, **kwargs):
+    autocomplete.remove_tag(instance.pk)
+
+
+@receiver(m2m_changed, sender=BlogPost.tags.through)
+def refresh_tag_post_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Tag suggestions are ranked by how many posts use the tag; recount the tags a
+    post_add/post_remove/clear touched.
+    """
+    if reverse:
+        # tag.blog_posts.add(...) and friends: only this tag's count changes
+        tag_ids = [instance.pk]
+    elif action == 'pre_clear':
+        if autocomplete.tags is not None:
+            instance._autocomplete_tag_ids = list(instance.tags.values_list('pk', flat=True))
+        return
+    elif action == 'post_clear':
+        tag_ids = getattr(instance, '_autocomplete_tag_ids', [])
+    else:
+        tag_ids = list(pk_set or ())
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        autocomplete.refresh_tag_counts(tag_ids)
+
+
+@receiver(posts_imported)
+def index_imported_posts(sender, posts, tags, new_tags, **kwargs):
+    get_search_backend().index_posts(posts)
+    for post in posts:
+        autocomplete.update_post(post)
+    for tag in new_tags:
+        autocomplete.update_tag(tag)
+    autocomplete.refresh_tag_counts([tag.pk for tag in tags])
+
@@ -0,0 +1,91 @@
+import re
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from .backends import tokenize
+
+
+WORD_RE = re.compile(r'\w+')
+
+SNIPPET_LENGTH = 200
+
+
+def find_matches(text, query, prefix=False):
+    """
+    (start, end, word) for every word in `text` matching a query term; with prefix=True the
+    last term also matches longer words, as in live search.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+    exact = set(terms[:-1] if prefix else terms)
+    partial = terms[-1] if prefix else None
+
+    matches = []
+    for match in WORD_RE.finditer(text):
+        word = match.group().lower()
+        if word in exact or (partial and word.startswith(partial)):
+            matches.append((match.start(), match.end(), word))
+    return matches
+
+
+def best_window(matches, length):
+    """
+    Pick the run of matches that fits in `length` characters and covers the most distinct
+    words (two-pointer scan, O(matches)). Returns (span_start, span_end).
+    """
+    best, best_score = (matches[0][0], matches[0][1]), 0
+    counts = {}
+    right = 0
+    for left in range(len(matches)):
+        while right < len(matches) and matches[right][1] - matches[left][0] <= length:
+            counts[matches[right][2]] = counts.get(matches[right][2], 0) + 1
+            right += 1
+        if right > left and len(counts) > best_score:
+            best, best_score = (matches[left][0], matches[right - 1][1]), len(counts)
+        if right > left:
+            word = matches[left][2]
+            counts[word] -= 1
+            if not counts[word]:
+                del counts[word]
+        else:
+            right = left + 1
+    return best
+
+
+def highlight(text, query, length=SNIPPET_LENGTH, prefix=False):
+    """
+    Return an escaped, at most `length`-character excerpt of `text` centred on the densest
+    cluster of query matches, with matches wrapped in <mark>. Falls back to the start of
+    the text when nothing matches.
+    """
+    matches = find_matches(text, query, prefix=prefix)
+    if matches:
+        span_start, span_end = best_window(matches, length)
+        slack = max(length - (span_end - span_start), 0)
+        start = max(0, span_start - slack // 2)
+        end = min(len(text), start + length)
+    else:
+        start, end = 0, min(len(text), length)
+        span_start, span_end = end, end
+
+    # Don't cut words in half at either edge
+    if start > 0:
+        space = text.find(' ', start, span_start)
+        start = space + 1 if space != -1 else start
+    if end < len(text):
+        space = text.rfind(' ', span_end, end)
+        end = space if space != -1 else end
+
+    parts = ['… '] if start > 0 else []
+    position = start
+    for match_start, match_end, word in matches:
+        if match_start < start or match_end > end:
+            continue
+        parts.append(escape(text[position:match_start]))
+        parts.append('<mark>%s</mark>' % escape(text[match_start:match_end]))
+        position = match_end
+    parts.append(escape(text[position:end]))
+    if end < len(text):
+        parts.append(' …')
+    return mark_safe(''.join(parts))
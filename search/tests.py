@@ -1,3 +1,199 @@
+from unittest import mock
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+from blogs.models import BlogPost, Tag
+from search.autocomplete import autocomplete
+from search.backends import InvertedIndexSearchBackend, get_search_backend
+from search.snippets import highlight
+from search.views import AJAX_RESULT_LIMIT, cached_prefix_candidates
 
-# Create your tests here.
+
+class InvertedIndexSearchBackendTest(TestCase):
+    def setUp(self):
+        self.backend = InvertedIndexSearchBackend()
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.title_match = BlogPost.objects.create(
+            title='Django performance', content='Notes on caching.', author=self.user
+        )
+        self.content_match = BlogPost.objects.create(
+            title='Weekly notes', content='A short remark about django templates.', author=self.user
+        )
+        self.other = BlogPost.objects.create(title='Gardening', content='Tomatoes and basil.', author=self.user)
+
+    def test_title_matches_rank_above_content_matches(self):
+        results = list(self.backend.search('django'))
+        self.assertEqual(results, [self.title_match, self.content_match])
+        self.assertGreater(results[0].rank, results[1].rank)
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(list(self.backend.search('django caching')), [self.title_match])
+        self.assertEqual(list(self.backend.search('django basil')), [])
+
+    def test_prefix_matches_last_term(self):
+        self.assertEqual(list(self.backend.search('djan')), [])
+        self.assertEqual(list(self.backend.search('djan', prefix=True)), [self.title_match, self.content_match])
+        self.assertEqual(list(self.backend.search('django cach', prefix=True)), [self.title_match])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.backend.search('django')  # build the index
+        self.other.content = 'Tomatoes, basil and django.'
+        self.backend.index_post(self.other)
+        self.assertIn(self.other, self.backend.search('django'))
+
+        self.backend.remove_post(self.title_match.pk)
+        self.assertNotIn(self.title_match, self.backend.search('django'))
+
+
+class SearchViewTest(TestCase):
+    def setUp(self):
+        backend = get_search_backend()
+        if hasattr(backend, 'reset'):
+            backend.reset()
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.post = BlogPost.objects.create(title='Django performance', content='Notes on caching.', author=self.user)
+        BlogPost.objects.create(title='Gardening', content='Tomatoes and basil.', author=self.user)
+
+    def test_search_returns_ranked_matches(self):
+        response = self.client.get(reverse('search:search'), {'query': 'caching'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['posts']), [self.post])
+
+    def test_new_posts_are_searchable(self):
+        self.client.get(reverse('search:search'), {'query': 'caching'})
+        new_post = BlogPost.objects.create(title='More caching', content='Fragments.', author=self.user)
+        response = self.client.get(reverse('search:search'), {'query': 'caching'})
+        self.assertIn(new_post, response.context['posts'])
+
+
+class SearchAjaxTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        backend = get_search_backend()
+        if hasattr(backend, 'reset'):
+            backend.reset()
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.post = BlogPost.objects.create(title='Django performance', content='Notes on caching.', author=self.user)
+        BlogPost.objects.create(title='Gardening', content='Tomatoes and basil.', author=self.user)
+
+    def search(self, query):
+        return self.client.get(reverse('search:search_ajax'), {'query': query}).json()
+
+    def test_returns_json_results_for_partial_words(self):
+        data = self.search('  DJAN ')
+        self.assertEqual(data['query'], 'djan')
+        self.assertEqual([result['id'] for result in data['results']], [self.post.pk])
+        self.assertEqual(data['results'][0]['title'], 'Django performance')
+        self.assertFalse(data['truncated'])
+
+    def test_short_queries_do_not_search(self):
+        with self.assertNumQueries(0):
+            data = self.search('dj')
+        self.assertEqual(data['results'], [])
+
+    def test_results_are_capped(self):
+        for i in range(AJAX_RESULT_LIMIT + 2):
+            BlogPost.objects.create(title=f'Django tip {i}', content='Short.', author=self.user)
+        data = self.search('django')
+        self.assertEqual(len(data['results']), AJAX_RESULT_LIMIT)
+        self.assertTrue(data['truncated'])
+        self.assertIsNone(cached_prefix_candidates('djangoo'))
+
+    def test_repeated_query_is_served_from_cache(self):
+        self.search('django')
+        with self.assertNumQueries(0):
+            data = self.search('Django')
+        self.assertEqual(len(data['results']), 1)
+
+    def test_cached_prefix_seeds_longer_query(self):
+        self.search('djan')
+        self.assertEqual(cached_prefix_candidates('django per'), [self.post.pk])
+        self.assertEqual([result['id'] for result in self.search('django per')['results']], [self.post.pk])
+
+    def test_stemming_backend_is_not_narrowed(self):
+        self.search('djan')
+        with mock.patch.object(get_search_backend(), 'stems', True):
+            self.assertIsNone(cached_prefix_candidates('django per'))
+
+    def test_prefix_lookup_is_one_cache_read(self):
+        self.search('djan')
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            self.assertEqual(cached_prefix_candidates('django per'), [self.post.pk])
+        self.assertEqual(get_many.call_count, 1)
+
+
+class AutocompleteTest(TestCase):
+    def setUp(self):
+        autocomplete.reset()
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.django = Tag.objects.create(name='Django')
+        self.devops = Tag.objects.create(name='DevOps')
+        self.post = BlogPost.objects.create(title='Django performance tips', content='Content', author=self.user)
+        self.post.tags.add(self.django)
+        autocomplete.ensure_built()
+
+    def test_suggestions_need_no_queries(self):
+        with self.assertNumQueries(0):
+            suggestions = autocomplete.suggest('perf')
+        self.assertEqual(suggestions['posts'], [{'id': self.post.pk, 'title': 'Django performance tips'}])
+
+    def test_tags_ranked_by_post_count(self):
+        self.post.tags.add(self.devops)
+        other = BlogPost.objects.create(title='Pipelines', content='Content', author=self.user)
+        other.tags.add(self.devops)
+        self.assertEqual([tag['name'] for tag in autocomplete.suggest('d')['tags']], ['DevOps', 'Django'])
+
+        other.tags.clear()
+        self.post.tags.remove(self.devops)
+        self.assertEqual([tag['post_count'] for tag in autocomplete.suggest('d')['tags']], [1, 0])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.post.title = 'Flask deployment'
+        self.post.save()
+        self.assertEqual(autocomplete.suggest('perf')['posts'], [])
+        self.assertEqual(len(autocomplete.suggest('deploy')['posts']), 1)
+
+        self.post.delete()
+        self.assertEqual(autocomplete.suggest('flask')['posts'], [])
+        self.assertEqual(autocomplete.suggest('django')['tags'][0]['post_count'], 0)
+
+        Tag.objects.create(name='Djangonaut')
+        self.devops.delete()
+        self.assertEqual([tag['name'] for tag in autocomplete.suggest('d')['tags']], ['Django', 'Djangonaut'])
+
+    def test_suggest_view(self):
+        data = self.client.get(reverse('search:suggest'), {'query': 'Dja'}).json()
+        self.assertEqual(data['posts'][0]['url'], reverse('blogs:post_detail', kwargs={'pk': self.post.pk}))
+        self.assertEqual(data['tags'][0]['url'], reverse('blogs:tag_detail', kwargs={'name': 'Django'}))
+
+
+class HighlightTest(TestCase):
+    def test_marks_matches_and_escapes_text(self):
+        snippet = highlight('Caching <b>Django</b> views', 'django')
+        self.assertEqual(snippet, 'Caching &lt;b&gt;<mark>Django</mark>&lt;/b&gt; views')
+
+    def test_window_is_bounded_and_centred_on_matches(self):
+        text = ' '.join(['filler'] * 200) + ' django caching notes ' + ' '.join(['filler'] * 200)
+        snippet = highlight(text, 'django caching', length=80)
+        self.assertIn('<mark>django</mark> <mark>caching</mark>', snippet)
+        self.assertTrue(snippet.startswith('… ') and snippet.endswith(' …'))
+        self.assertLessEqual(len(snippet.replace('<mark>', '').replace('</mark>', '')), 80 + 4)
+
+    def test_prefix_highlights_partial_last_term(self):
+        self.assertEqual(highlight('Django tips', 'djan', prefix=True), '<mark>Django</mark> tips')
+
+    def test_falls_back_to_start_of_text(self):
+        snippet = highlight('word ' * 100, 'missing', length=20)
+        self.assertTrue(snippet.startswith('word word'))
+        self.assertTrue(snippet.endswith(' …'))
+
+    def test_search_results_show_snippets(self):
+        user = User.objects.create_user(username='testuser', password='password123')
+        backend = get_search_backend()
+        if hasattr(backend, 'reset'):
+            backend.reset()
+        BlogPost.objects.create(title='Notes', content='Long body about caching. ' * 50, author=user)
+        response = self.client.get(reverse('search:search'), {'query': 'caching'})
+        self.assertContains(response, '<mark>caching</mark>')
+        self.assertLess(len(response.context['posts'][0].snippet), 400)  # content is ~1250 chars
@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import SearchView, search_ajax
+from .views import SearchView, search_ajax, suggest
 
 app_name = 'search'
 
 urlpatterns = [
     path('results/', SearchView.as_view(), name='search'),
     path('ajax/', search_ajax, name='search_ajax'),
+    path('suggest/', suggest, name='suggest'),
 ]
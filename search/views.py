@@ -1,29 +1,37 @@
+import hashlib
 from django.views.generic import ListView
-from django.db.models import Q
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
 from blogs.models import BlogPost
+from .autocomplete import autocomplete
+from .backends import get_search_backend
 from .forms import SearchForm
-from django.shortcuts import render
+from .snippets import highlight
 from django.http import JsonResponse
 
 
 class SearchView(ListView):
     model = BlogPost
-    template_name = 'search_results.html'
+    template_name = 'search/search_results.html'
     context_object_name = 'posts'
     paginate_by = 10
 
     def get_queryset(self):
+        self.query = ''
         form = SearchForm(self.request.GET)
         if form.is_valid():
-            query = form.cleaned_data['query']
-            return BlogPost.objects.filter(
-                Q(title__icontains=query) | Q(content__icontains=query)
-            ).distinct()
+            self.query = form.cleaned_data['query']
+            # Ranked full-text search (see search.backends) instead of icontains scans
+            return get_search_backend().search(self.query, BlogPost.objects.with_card_relations())
         return BlogPost.objects.none()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form'] = SearchForm(self.request.GET or None)
+        # Highlighted excerpts, computed once per hit on the current page only
+        for post in context['posts']:
+            post.snippet = highlight(post.content, self.query)
         return context
 
 
@@ -33,23 +41,108 @@ class SearchView(ListView):
 
 
 
+# Live search (search_ajax) limits
+AJAX_MIN_QUERY_LENGTH = 3
+AJAX_RESULT_LIMIT = 8
+AJAX_CACHE_TIMEOUT = 60
+AJAX_SNIPPET_LENGTH = 160
+
+
+def normalize_query(query):
+    """Lowercase, trim and collapse whitespace so equivalent queries share a cache entry."""
+    return ' '.join(query.lower().split())[:SearchForm.base_fields['query'].max_length]
+
+
+def ajax_cache_key(query):
+    return 'search:ajax:' + hashlib.md5(query.encode()).hexdigest()
+
+
+def cached_prefix_candidates(query):
+    """
+    Return the post ids of the longest cached, complete (not truncated) result set for a
+    prefix of `query`, or None. Live search matches the last term as a prefix, so results
+    for a longer query are a subset of those for any of its prefixes, unless the backend
+    stems terms (see BaseSearchBackend.stems).
+    """
+    if get_search_backend().stems:
+        return None
+    keys = {end: ajax_cache_key(query[:end]) for end in range(len(query) - 1, AJAX_MIN_QUERY_LENGTH - 1, -1)}
+    if not keys:
+        return None
+    cached = cache.get_many(keys.values())
+    for end, key in keys.items():
+        if key in cached and not cached[key]['truncated']:
+            return [result['id'] for result in cached[key]['results']]
+    return None
+
+
 def search_ajax(request):
-    query = request.GET.get('query', '')
-    form = SearchForm(initial={'query': query})
-
-    if query:
-        posts = BlogPost.objects.filter(
-            Q(title__icontains=query) | Q(content__icontains=query)
-        )
-    else:
-        posts = BlogPost.objects.none()
-
-    context = {
-        'form': form,
-        'posts': posts,
-        'is_paginated': False,  # No pagination for AJAX results
-    }
-    
-    html = render_to_string('search_results.html', context, request=request)
-    return JsonResponse({'html': html})
+    """
+    Live search used by the navbar box: returns at most AJAX_RESULT_LIMIT matches as JSON
+    (with escaped, <mark>-highlighted snippets instead of whole posts),
+    caches them briefly per normalized query and, on backends that don't stem, narrows new
+    queries to the ids already found for a cached prefix ("djan" seeds "djang").
+
+    The normalized query is echoed back, so the client can abort in-flight requests and
+    drop any response that no longer matches what is in the box.
+    """
+    query = normalize_query(request.GET.get('query', ''))
+    if len(query) < AJAX_MIN_QUERY_LENGTH:
+        return JsonResponse({'query': query, 'results': [], 'truncated': False})
+
+    key = ajax_cache_key(query)
+    payload = cache.get(key)
+    if payload is None:
+        queryset = BlogPost.objects.all()
+        candidates = cached_prefix_candidates(query)
+        if candidates is not None:
+            queryset = queryset.filter(pk__in=candidates)
+
+        posts = get_search_backend().search(query, queryset, prefix=True).only('id', 'title', 'content')
+        posts = list(posts[:AJAX_RESULT_LIMIT + 1])
+
+        payload = {
+            'query': query,
+            'results': [
+                {
+                    'id': post.pk,
+                    'title': post.title,
+                    'url': reverse('blogs:post_detail', kwargs={'pk': post.pk}),
+                    'snippet': highlight(post.content, query, AJAX_SNIPPET_LENGTH, prefix=True),
+                }
+                for post in posts[:AJAX_RESULT_LIMIT]
+            ],
+            'truncated': len(posts) > AJAX_RESULT_LIMIT,
+        }
+        cache.set(key, payload, AJAX_CACHE_TIMEOUT)
+
+    response = JsonResponse(payload)
+    patch_cache_control(response, public=True, max_age=AJAX_CACHE_TIMEOUT)
+    return response
+
+
+
+
+
+
+
+
+SUGGEST_MIN_PREFIX_LENGTH = 2
+SUGGEST_LIMIT = 5
+
+
+def suggest(request):
+    """
+    Title and tag autocomplete served from the in-memory prefix index (search.autocomplete).
+    """
+    prefix = normalize_query(request.GET.get('query', ''))
+    if len(prefix) < SUGGEST_MIN_PREFIX_LENGTH:
+        return JsonResponse({'query': prefix, 'posts': [], 'tags': []})
+
+    suggestions = autocomplete.suggest(prefix, SUGGEST_LIMIT)
+    for post in suggestions['posts']:
+        post['url'] = reverse('blogs:post_detail', kwargs={'pk': post['id']})
+    for tag in suggestions['tags']:
+        tag['url'] = reverse('blogs:tag_detail', kwargs={'name': tag['name']})
+    return JsonResponse({'query': prefix, **suggestions})
 